@@ -1,25 +1,32 @@
-import nltk
-import read_csv
+import ai_lexicon
+import bootstrap
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
-nltk.download('vader_lexicon')
-sia = SentimentIntensityAnalyzer()
-ai_lexicon = read_csv.ai_lexicon_words_dict('data/ai_lexicon.csv')
-abs_errors = []
-py_scores = []
-program_scores = []
 
+def compare_with_vader() -> tuple[list[float], list[float], list[float], float]:
+    """Return VADER's compound score of every word in the AI lexicon, the lexicon's own score of each word (scaled
+    to VADER's range), the absolute difference between the two, and the mean absolute error."""
+    bootstrap.preflight(['vader_lexicon'], [])
+    sia = SentimentIntensityAnalyzer()
+    ai_scores = ai_lexicon.get_ai_lexicon().all_scores()
+    abs_errors = []
+    py_scores = []
+    program_scores = []
 
-for word in ai_lexicon:
-    py_sentiment_score = sia.polarity_scores(word)['compound']
-    program_sentiment_score = ai_lexicon[word]/2
-    abs_error = abs(program_sentiment_score-py_sentiment_score)
-    abs_errors.append(abs_error)
-    py_scores.append(py_sentiment_score)
-    program_scores.append(program_sentiment_score)
+    for word in ai_scores:
+        py_sentiment_score = sia.polarity_scores(word)['compound']
+        program_sentiment_score = ai_scores[word]/2
+        abs_error = abs(program_sentiment_score-py_sentiment_score)
+        abs_errors.append(abs_error)
+        py_scores.append(py_sentiment_score)
+        program_scores.append(program_sentiment_score)
 
-MAE = sum(abs_errors)/len(abs_errors)
-print(py_scores)
-print(program_scores)
-print(abs_errors)
-print(MAE)
+    return py_scores, program_scores, abs_errors, sum(abs_errors)/len(abs_errors)
+
+
+if __name__ == '__main__':
+    py_scores, program_scores, abs_errors, MAE = compare_with_vader()
+    print(py_scores)
+    print(program_scores)
+    print(abs_errors)
+    print(MAE)
@@ -0,0 +1,588 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the storage for the AI lexicon, the lexicon of words that the AI mode learns on its own.
+
+For every word, the AI lexicon keeps a sentiment sum and a count; the word's score is sum / count. The canonical
+copy lives in data/ai_lexicon.csv, with one "word,sentiment_sum,word_count" row per word. Learning never rewrites
+that file. Instead, each update is appended to a delta log (data/ai_lexicon_log.csv) in the same row format, and
+folded into an in-memory table. Compaction folds the log into a new canonical CSV and empties the log, either
+explicitly or once the log has grown past a threshold, so the cost of learning from one text does not depend on
+the size of the lexicon. An update can be given a batch id, which is written with it as a "#batch,<id>" row and
+kept through compaction, so that an update retried after a crash (e.g. by a resumed training run) is recorded once.
+
+When several worker processes learn at once, the lexicon can instead be kept in a SQLite database (see
+SQLiteAILexicon and get_ai_lexicon). Run this file to compact the lexicon by hand or to move it between the two
+formats:
+
+    python ai_lexicon.py compact
+    python ai_lexicon.py import --csv data/ai_lexicon.csv --db data/ai_lexicon.sqlite3
+    python ai_lexicon.py export --db data/ai_lexicon.sqlite3 --csv data/ai_lexicon.csv
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import contextlib
+import csv
+import io
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to the in-process lock only.
+    fcntl = None
+
+AI_LEXICON_FILE = 'data/ai_lexicon.csv'
+AI_LEXICON_DB_FILE = 'data/ai_lexicon.sqlite3'
+
+# The lexicon has been written on machines with different default encodings, so stray non UTF-8 bytes are carried
+# through unchanged instead of failing the read.
+ENCODING = 'utf-8'
+ERRORS = 'surrogateescape'
+
+# The number of delta records after which the log is automatically folded into the canonical CSV.
+COMPACT_AFTER = 5000
+
+# The first column of the rows recording the id of a batch of deltas (see AILexicon.record_many).
+BATCH_MARKER = '#batch'
+
+
+class AILexicon:
+    """The AI lexicon, backed by a canonical CSV file and an append-only delta log.
+
+    Representation Invariants:
+        - all(count > 0 for _, count in self._table.values())
+    """
+    # Private Instance Attributes:
+    # - _csv_file: The path of the canonical CSV file.
+    # - _log_file: The path of the delta log.
+    # - _compact_after: The number of log records that triggers an automatic compaction.
+    # - _table: Maps each word to its [sentiment_sum, word_count], with every delta read so far folded in.
+    # - _csv_mtime: The modification time of the canonical CSV when it was last read.
+    # - _log_offset: The number of bytes of the delta log that have been folded into _table.
+    # - _log_records: The number of delta records folded into _table since the last compaction.
+    # - _batches: The ids of the batches of deltas recorded so far.
+    # - _lock: Guards the table and the files against concurrent use by threads of this process.
+
+    _csv_file: str
+    _log_file: str
+    _compact_after: int
+    _table: dict[str, list[float]]
+    _csv_mtime: int
+    _log_offset: int
+    _log_records: int
+    _batches: set[str]
+    _lock: threading.RLock
+
+    def __init__(self, csv_file: str = AI_LEXICON_FILE, log_file: Optional[str] = None,
+                 compact_after: int = COMPACT_AFTER) -> None:
+        """Initialize the lexicon stored in the given canonical CSV file and delta log.
+
+        If no log file is given, the log is kept next to the CSV file.
+        """
+        self._csv_file = csv_file
+        self._log_file = log_file if log_file is not None else _default_log_file(csv_file)
+        self._compact_after = compact_after
+        self._table = {}
+        self._csv_mtime = -2
+        self._log_offset = 0
+        self._log_records = 0
+        self._batches = set()
+        self._lock = threading.RLock()
+
+    def __contains__(self, word: str) -> bool:
+        with self._lock:
+            self.refresh()
+            return word in self._table
+
+    def __len__(self) -> int:
+        with self._lock:
+            self.refresh()
+            return len(self._table)
+
+    def refresh(self) -> None:
+        """Bring the in-memory table up to date with the files on disk.
+
+        The canonical CSV is only re-read when it has been replaced (e.g. compacted by another process); otherwise
+        only the log records appended since the last refresh are read. The files are read under a shared lock, so
+        a compaction in another process cannot replace the CSV between the reads of the CSV and of the log, which
+        would count the folded deltas twice.
+        """
+        with self._lock, _file_lock(self._log_file, shared=True):
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """Bring the in-memory table up to date, as refresh does. The caller holds the file lock."""
+        csv_mtime = _mtime(self._csv_file)
+        if csv_mtime != self._csv_mtime or _size(self._log_file) < self._log_offset:
+            self._reload(csv_mtime)
+        else:
+            self._read_log()
+
+    def _reload(self, csv_mtime: int) -> None:
+        """Rebuild the table from the canonical CSV and the whole delta log."""
+        self._table = {}
+        self._batches = set()
+        if os.path.exists(self._csv_file):
+            with open(self._csv_file, newline='', encoding=ENCODING, errors=ERRORS) as file:
+                for row in csv.reader(file):
+                    # Older versions of the lexicon may list a word more than once; the last row wins, as it
+                    # always has for readers of this file.
+                    if len(row) >= 3:
+                        self._table[row[0]] = [float(row[1]), float(row[2])]
+                    elif len(row) == 2 and row[0] == BATCH_MARKER:
+                        self._batches.add(row[1])
+        self._csv_mtime = csv_mtime
+        self._log_offset = 0
+        self._log_records = 0
+        self._read_log()
+
+    def _read_log(self) -> None:
+        """Fold the complete records appended to the delta log since the last read into the table."""
+        if _size(self._log_file) <= self._log_offset:
+            return
+        with open(self._log_file, 'rb') as file:
+            file.seek(self._log_offset)
+            data = file.read()
+        # A record is only complete once its newline has been written.
+        data = data[:data.rfind(b'\n') + 1]
+        lines = data.decode(ENCODING, ERRORS).splitlines()
+        self._fold(csv.reader(lines))
+        self._log_offset += len(data)
+        self._log_records += len(lines)
+
+    def _fold(self, rows: Iterable[list[str]]) -> None:
+        """Add the sums and counts of the given "word,sentiment_sum,word_count" delta rows to the table, and note
+        the ids of the batches among them."""
+        for row in rows:
+            if len(row) == 2 and row[0] == BATCH_MARKER:
+                self._batches.add(row[1])
+            if len(row) < 3:
+                continue
+            entry = self._table.setdefault(row[0], [0.0, 0.0])
+            entry[0] += float(row[1])
+            entry[1] += float(row[2])
+
+    def score(self, word: str) -> Optional[float]:
+        """Return the learned sentiment score of the given word, or None if the word has not been learned."""
+        return self.scores([word]).get(word)
+
+    def scores(self, words: Iterable[str]) -> dict[str, float]:
+        """Return the learned sentiment scores of those of the given words that are in the lexicon."""
+        with self._lock:
+            self.refresh()
+            return {word: self._table[word][0] / self._table[word][1] for word in words if word in self._table}
+
+    def all_scores(self) -> dict[str, float]:
+        """Return the learned sentiment score of every word in the lexicon."""
+        with self._lock:
+            self.refresh()
+            return {word: entry[0] / entry[1] for word, entry in self._table.items()}
+
+    def entries(self) -> dict[str, tuple[float, float]]:
+        """Return the (sentiment_sum, word_count) of every word in the lexicon."""
+        with self._lock:
+            self.refresh()
+            return {word: (entry[0], entry[1]) for word, entry in self._table.items()}
+
+    def version(self) -> tuple[int, int]:
+        """Return a value that changes whenever the contents of the lexicon may have changed, in this process or
+        any other: the modification time of the canonical CSV and the length of the delta log."""
+        with self._lock:
+            self.refresh()
+            return self._csv_mtime, self._log_offset
+
+    def record_many(self, deltas: Mapping[str, tuple[float, float]], batch_id: Optional[str] = None) -> bool:
+        """Add the given (sentiment_sum, word_count) deltas to the lexicon, and return whether they were added.
+
+        All the deltas are appended to the log in a single write. If a batch id is given, it is written along with
+        them, and the deltas are not added if a batch with that id already has been.
+        """
+        if not deltas and batch_id is None:
+            return False
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([word, delta[0], delta[1]] for word, delta in deltas.items())
+        if batch_id is not None:
+            writer.writerow([BATCH_MARKER, batch_id])
+
+        with self._lock:
+            with _file_lock(self._log_file):
+                if batch_id is not None:
+                    self._refresh()
+                    if batch_id in self._batches:
+                        return False
+                with open(self._log_file, 'a', newline='', encoding=ENCODING, errors=ERRORS) as file:
+                    file.write(buffer.getvalue())
+            self.refresh()
+            if self._log_records >= self._compact_after:
+                self.compact()
+        return True
+
+    def record(self, word: str, pathos: float) -> None:
+        """Record one more occurrence of the given word with the given (signed) pathos score."""
+        self.record_many({word: (pathos, 1)})
+
+    def compact(self) -> None:
+        """Fold the delta log into a new canonical CSV file and empty the log.
+
+        The new CSV is written to a temporary file and moved into place, so readers never see a partial file.
+        """
+        with self._lock, _file_lock(self._log_file):
+            self._refresh()
+            write_csv(self._table, self._csv_file, self._batches)
+            if os.path.exists(self._log_file):
+                os.truncate(self._log_file, 0)
+            self._csv_mtime = _mtime(self._csv_file)
+            self._log_offset = 0
+            self._log_records = 0
+
+
+@contextlib.contextmanager
+def _file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on a sidecar of the given file, so that other processes do not append to the log, or
+    read the CSV and the log, while it is being compacted. Readers take the lock in shared mode, and writers in
+    exclusive mode. Does nothing where fcntl is not available.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _default_log_file(csv_file: str) -> str:
+    """Return the path of the delta log kept next to the given canonical CSV file.
+
+    >>> _default_log_file('data/ai_lexicon.csv')
+    'data/ai_lexicon_log.csv'
+    """
+    root, extension = os.path.splitext(csv_file)
+    return root + '_log' + extension
+
+
+def _mtime(path: str) -> int:
+    """Return the modification time of the given file in nanoseconds, or -1 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def _size(path: str) -> int:
+    """Return the size of the given file in bytes, or 0 if it does not exist."""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def write_csv(entries: Mapping[str, Iterable[float]], csv_file: str, batches: Iterable[str] = ()) -> None:
+    """Write the given word -> (sentiment_sum, word_count) entries, followed by the ids of the given batches of
+    deltas already recorded, to csv_file in the canonical format.
+
+    The rows are written to a temporary file that is then moved into place, so readers never see a partial file.
+    """
+    temporary_file = csv_file + '.tmp'
+    with open(temporary_file, 'w', newline='', encoding=ENCODING, errors=ERRORS) as file:
+        writer = csv.writer(file)
+        writer.writerows([word, *entry] for word, entry in entries.items())
+        writer.writerows([BATCH_MARKER, batch_id] for batch_id in sorted(batches))
+    os.replace(temporary_file, csv_file)
+
+
+class SQLiteAILexicon:
+    """The AI lexicon, stored in a local SQLite database.
+
+    This is the backend to use when several worker processes learn at the same time. The database is opened in
+    write-ahead-log mode, so readers never block the writer and the writer never blocks readers, and every batch of
+    updates is a single transaction of upserts, so concurrent workers cannot lose or corrupt each other's updates.
+
+    It offers the same methods as AILexicon.
+    """
+    # Private Instance Attributes:
+    # - _db_file: The path of the SQLite database.
+    # - _local: Holds one connection per thread, since SQLite connections cannot be shared between threads.
+
+    _db_file: str
+    _local: threading.local
+
+    def __init__(self, db_file: str = AI_LEXICON_DB_FILE) -> None:
+        """Initialize the lexicon stored in the given database file, creating its table if needed."""
+        self._db_file = db_file
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS ai_lexicon ('
+                               'word TEXT PRIMARY KEY, sentiment_sum REAL NOT NULL, word_count REAL NOT NULL'
+                               ') WITHOUT ROWID')
+            connection.execute('CREATE TABLE IF NOT EXISTS ai_lexicon_version (version INTEGER NOT NULL)')
+            connection.execute('INSERT INTO ai_lexicon_version (version) '
+                               'SELECT 0 WHERE NOT EXISTS (SELECT * FROM ai_lexicon_version)')
+            connection.execute('CREATE TABLE IF NOT EXISTS ai_lexicon_batches (id TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._db_file, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def __contains__(self, word: str) -> bool:
+        return self.score(word) is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM ai_lexicon').fetchone()[0]
+
+    def refresh(self) -> None:
+        """Do nothing; every read goes to the database."""
+
+    def score(self, word: str) -> Optional[float]:
+        """Return the learned sentiment score of the given word, or None if the word has not been learned."""
+        return self.scores([word]).get(word)
+
+    def scores(self, words: Iterable[str]) -> dict[str, float]:
+        """Return the learned sentiment scores of those of the given words that are in the lexicon."""
+        words = list(dict.fromkeys(_storable(word) for word in words))
+        found = {}
+        # Stay well below SQLite's limit on the number of parameters of one statement.
+        for start in range(0, len(words), 500):
+            chunk = words[start:start + 500]
+            rows = self._connection().execute(
+                'SELECT word, sentiment_sum / word_count FROM ai_lexicon WHERE word IN (%s)'
+                % ','.join('?' * len(chunk)), chunk)
+            found.update(rows)
+        return found
+
+    def all_scores(self) -> dict[str, float]:
+        """Return the learned sentiment score of every word in the lexicon."""
+        return dict(self._connection().execute('SELECT word, sentiment_sum / word_count FROM ai_lexicon'))
+
+    def entries(self) -> dict[str, tuple[float, float]]:
+        """Return the (sentiment_sum, word_count) of every word in the lexicon."""
+        rows = self._connection().execute('SELECT word, sentiment_sum, word_count FROM ai_lexicon')
+        return {word: (sentiment_sum, word_count) for word, sentiment_sum, word_count in rows}
+
+    def version(self) -> int:
+        """Return the number of times the lexicon has been changed, which is kept in the database itself."""
+        return self._connection().execute('SELECT version FROM ai_lexicon_version').fetchone()[0]
+
+    def record_many(self, deltas: Mapping[str, tuple[float, float]], batch_id: Optional[str] = None) -> bool:
+        """Add the given (sentiment_sum, word_count) deltas to the lexicon in one transaction, and return whether
+        they were added.
+
+        If a batch id is given, it is stored in the same transaction, and the deltas are not added if a batch with
+        that id already has been.
+        """
+        if not deltas and batch_id is None:
+            return False
+        with self._connection() as connection:
+            if batch_id is not None and connection.execute('INSERT OR IGNORE INTO ai_lexicon_batches (id) VALUES (?)',
+                                                           (batch_id,)).rowcount == 0:
+                return False
+            connection.execute('UPDATE ai_lexicon_version SET version = version + 1')
+            connection.executemany(
+                'INSERT INTO ai_lexicon (word, sentiment_sum, word_count) VALUES (?, ?, ?) '
+                'ON CONFLICT (word) DO UPDATE SET sentiment_sum = sentiment_sum + excluded.sentiment_sum, '
+                'word_count = word_count + excluded.word_count',
+                [(_storable(word), delta[0], delta[1]) for word, delta in deltas.items()])
+        return True
+
+    def record(self, word: str, pathos: float) -> None:
+        """Record one more occurrence of the given word with the given (signed) pathos score."""
+        self.record_many({word: (pathos, 1)})
+
+    def compact(self) -> None:
+        """Fold the write-ahead log back into the database file."""
+        self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def import_csv(self, csv_file: str = AI_LEXICON_FILE) -> None:
+        """Replace the entries of the words in the given CSV-backed lexicon (and its delta log) with theirs."""
+        entries = AILexicon(csv_file).entries()
+        with self._connection() as connection:
+            connection.execute('UPDATE ai_lexicon_version SET version = version + 1')
+            connection.executemany(
+                'INSERT INTO ai_lexicon (word, sentiment_sum, word_count) VALUES (?, ?, ?) '
+                'ON CONFLICT (word) DO UPDATE SET sentiment_sum = excluded.sentiment_sum, '
+                'word_count = excluded.word_count',
+                [(_storable(word), entry[0], entry[1]) for word, entry in entries.items()])
+
+    def export_csv(self, csv_file: str = AI_LEXICON_FILE) -> None:
+        """Write every entry of the lexicon to the given file in the canonical CSV format."""
+        write_csv(self.entries(), csv_file)
+
+
+def _storable(word: str) -> str:
+    """Return the given word with any undecodable bytes read from an old CSV replaced, so SQLite can store it.
+
+    >>> _storable('happy')
+    'happy'
+    >>> _storable(b'\\x92'.decode(ENCODING, ERRORS))
+    '\\ufffd'
+    """
+    return word.encode(ENCODING, ERRORS).decode(ENCODING, 'replace')
+
+
+class MemoryAILexicon:
+    """An AI lexicon kept only in memory, which also remembers what it has learned since it was created.
+
+    A trainer gives each of its workers one of these, starting from a copy of the shared lexicon, and then adds
+    the deltas they learned to the shared lexicon. A frozen lexicon ignores what it is taught, so that texts can be
+    scored with the AI lexicon without changing it. It offers the same methods as AILexicon.
+
+    >>> lexicon = MemoryAILexicon({'happy': (3.0, 2.0)})
+    >>> lexicon.record('happy', 1); lexicon.record('sad', -1)
+    >>> lexicon.score('happy'), lexicon.deltas()
+    (1.3333333333333333, {'happy': (1.0, 1.0), 'sad': (-1.0, 1.0)})
+    """
+    # Private Instance Attributes:
+    # - _table: Maps each word to its [sentiment_sum, word_count].
+    # - _deltas: Maps each word learned since this lexicon was created to the [sentiment_sum, word_count] learned.
+    # - _version: The number of times the lexicon has been changed.
+    # - _frozen: Whether record_many ignores what it is given.
+    # - _batches: The ids of the batches of deltas added so far.
+
+    _table: dict[str, list[float]]
+    _deltas: dict[str, list[float]]
+    _version: int
+    _frozen: bool
+    _batches: set[str]
+
+    def __init__(self, entries: Optional[Mapping[str, tuple[float, float]]] = None, frozen: bool = False) -> None:
+        """Initialize a lexicon holding a copy of the given (sentiment_sum, word_count) entries, which never
+        changes if frozen is True."""
+        self._table = {word: [float(entry[0]), float(entry[1])] for word, entry in (entries or {}).items()}
+        self._deltas = {}
+        self._version = 0
+        self._frozen = frozen
+        self._batches = set()
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def refresh(self) -> None:
+        """Do nothing; the lexicon only changes through this object."""
+
+    def score(self, word: str) -> Optional[float]:
+        """Return the learned sentiment score of the given word, or None if the word has not been learned."""
+        return self.scores([word]).get(word)
+
+    def scores(self, words: Iterable[str]) -> dict[str, float]:
+        """Return the learned sentiment scores of those of the given words that are in the lexicon."""
+        return {word: self._table[word][0] / self._table[word][1] for word in words if word in self._table}
+
+    def all_scores(self) -> dict[str, float]:
+        """Return the learned sentiment score of every word in the lexicon."""
+        return {word: entry[0] / entry[1] for word, entry in self._table.items()}
+
+    def entries(self) -> dict[str, tuple[float, float]]:
+        """Return the (sentiment_sum, word_count) of every word in the lexicon."""
+        return {word: (entry[0], entry[1]) for word, entry in self._table.items()}
+
+    def deltas(self) -> dict[str, tuple[float, float]]:
+        """Return the (sentiment_sum, word_count) learned for every word since this lexicon was created."""
+        return {word: (delta[0], delta[1]) for word, delta in self._deltas.items()}
+
+    def version(self) -> int:
+        """Return the number of times the lexicon has been changed."""
+        return self._version
+
+    def record_many(self, deltas: Mapping[str, tuple[float, float]], batch_id: Optional[str] = None) -> bool:
+        """Add the given (sentiment_sum, word_count) deltas to the lexicon, unless it is frozen or a batch with the
+        given id has already been added, and return whether they were added."""
+        if self._frozen or (batch_id is not None and batch_id in self._batches):
+            return False
+        if batch_id is not None:
+            self._batches.add(batch_id)
+        for word, delta in deltas.items():
+            for table in (self._table, self._deltas):
+                entry = table.setdefault(word, [0.0, 0.0])
+                entry[0] += delta[0]
+                entry[1] += delta[1]
+        if deltas:
+            self._version += 1
+        return bool(deltas) or batch_id is not None
+
+    def record(self, word: str, pathos: float) -> None:
+        """Record one more occurrence of the given word with the given (signed) pathos score."""
+        self.record_many({word: (pathos, 1)})
+
+    def compact(self) -> None:
+        """Do nothing; there are no files to compact."""
+
+
+def merge_deltas(total: dict[str, tuple[float, float]], deltas: Mapping[str, tuple[float, float]]) -> None:
+    """Add the given (sentiment_sum, word_count) deltas to total, in the order they are given in.
+
+    >>> total = {'happy': (1.0, 1.0)}
+    >>> merge_deltas(total, {'happy': (2.0, 1.0), 'sad': (-1.0, 1.0)})
+    >>> total
+    {'happy': (3.0, 2.0), 'sad': (-1.0, 1.0)}
+    """
+    for word, delta in deltas.items():
+        entry = total.get(word, (0.0, 0.0))
+        total[word] = (entry[0] + delta[0], entry[1] + delta[1])
+
+
+_ai_lexicon: Optional[AILexicon | SQLiteAILexicon | MemoryAILexicon] = None
+_ai_lexicon_lock = threading.Lock()
+
+
+def get_ai_lexicon() -> AILexicon | SQLiteAILexicon | MemoryAILexicon:
+    """Return the AI lexicon shared by this process.
+
+    The backend is chosen by the AI_LEXICON_BACKEND environment variable: "csv" (the default) for the CSV file
+    and its delta log, or "sqlite" for the database named by AI_LEXICON_DB (data/ai_lexicon.sqlite3 by default).
+    """
+    global _ai_lexicon
+    if _ai_lexicon is None:
+        with _ai_lexicon_lock:
+            if _ai_lexicon is None:
+                if os.environ.get('AI_LEXICON_BACKEND', 'csv') == 'sqlite':
+                    _ai_lexicon = SQLiteAILexicon(os.environ.get('AI_LEXICON_DB', AI_LEXICON_DB_FILE))
+                else:
+                    _ai_lexicon = AILexicon()
+    return _ai_lexicon
+
+
+def set_ai_lexicon(lexicon: AILexicon | SQLiteAILexicon | MemoryAILexicon) -> None:
+    """Make the given lexicon the AI lexicon shared by this process, e.g. a MemoryAILexicon in a training worker."""
+    global _ai_lexicon
+    with _ai_lexicon_lock:
+        _ai_lexicon = lexicon
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Maintain the AI lexicon.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('compact', help='fold the log of the configured backend into its main file')
+    for command, description in [('import', 'copy a CSV lexicon into a SQLite lexicon'),
+                                 ('export', 'write a SQLite lexicon out as a CSV lexicon')]:
+        subparser = commands.add_parser(command, help=description)
+        subparser.add_argument('--csv', default=AI_LEXICON_FILE)
+        subparser.add_argument('--db', default=AI_LEXICON_DB_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'compact':
+        get_ai_lexicon().compact()
+    elif args.command == 'import':
+        SQLiteAILexicon(args.db).import_csv(args.csv)
+    else:
+        SQLiteAILexicon(args.db).export_csv(args.csv)
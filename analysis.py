@@ -9,28 +9,27 @@ Copyright
 ==========
 This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
 """
-import csv
-import os
-import nltk
+from __future__ import annotations
+import collections
+import functools
+import ai_lexicon
+import document
+import metrics
+import nlp_models
 import parse_tree
+import phrase_matcher
 import process
-import read_csv
-from typing import Union
+import sentiment_lexicon
+from typing import Any, Iterable, Iterator, Mapping, Optional, Union
 
 
 def create_lexicon() -> dict:
-    """Create a sentiment analysis dictionary. """
-    lexicon = {}
-    nltk.download('opinion_lexicon')
-    positive_words = set(nltk.corpus.opinion_lexicon.positive())
-    negative_words = set(nltk.corpus.opinion_lexicon.negative())
-    for word in positive_words:
-        lexicon[word] = 1
-    for word in negative_words:
-        lexicon[word] = -1
-    dict_from_csv = read_csv.return_dictionary('data/positive_words.csv', 'data/negative_words.csv')
-    lexicon.update(dict_from_csv)
-    return lexicon
+    """Create a sentiment analysis dictionary.
+
+    The dictionary is a mutable copy of the shared snapshot from sentiment_lexicon.get_lexicon, which should be used
+    directly wherever the lexicon is only read.
+    """
+    return dict(sentiment_lexicon.get_lexicon().words)
 
 
 def relevant(tag: str) -> bool:
@@ -42,108 +41,86 @@ def relevant(tag: str) -> bool:
     return tag.startswith('JJ') or tag.startswith('NN') or (tag.startswith('VB') and tag != 'VBP')
 
 
-def present_in_file(word: str, csv_file: str) -> bool:
-    """Return whether a word is present in the lexicon or not
-
-    NOTE: It is not possible to write doctests for this function because the lexicon keeps changing
-    """
-    with open(csv_file) as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if word in row:
-                return True
-    return False
-
-
-def find_absents(text: str, old_lexicon: dict) -> list[str]:
+def find_absents(text: Union[str, document.Document], old_lexicon: Mapping[str, int]) -> list[str]:
     """Returns a set of all the words in a text that are not already there in the lexicon.
+
+    The words and their tags are read from the text's spaCy parse, which is shared with the rest of the analysis.
     """
-    tokens = nltk.word_tokenize(text)
-    tagged = nltk.pos_tag(tokens)
+    parsed = document.as_document(text)
 
     absent = []
 
-    for word_tag in tagged:
-        if relevant(word_tag[1]) and word_tag[0] not in old_lexicon:
-            absent.append(word_tag[0])
+    for token in parsed.tokens:
+        if relevant(token.tag_) and token.text not in old_lexicon:
+            absent.append(token.text)
 
     return absent
 
 
-def create_lexicon_ai(text: str, old_lexicon: dict) -> dict:
+def create_lexicon_ai(text: Union[str, document.Document],
+                      old_lexicon: Mapping[str, int]) -> Mapping[str, Union[int, float]]:
     """Return a sentiment analysis dictionary.
 
-    If a word in the text is a noun or adjective or adverb and is not in the dictionary, add it
-    to the ai_lexicon.csv file.
+    If a word in the text is a noun or adjective or adverb and is not in the dictionary, its learned score from the
+    AI lexicon is added to the dictionary.
     """
     absent = find_absents(text, old_lexicon)
 
     if not absent:
         return old_lexicon
     else:
-        lexicon = {}
-        with open('data/ai_lexicon.csv') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                for word in absent:
-                    if row[0] == word:
-                        lexicon[row[0]] = float(row[1]) / float(row[2])
-
-    lexicon.update(create_lexicon())
+        lexicon = ai_lexicon.get_ai_lexicon().scores(absent)
+
+    lexicon.update(sentiment_lexicon.get_lexicon().words)
     return lexicon
 
 
-def update_lexicon_data_ai(text: str, pathos: float, negative_sentiment: bool, old_lexicon: dict) -> None:
-    """ This function will update the lexicon based on the missing words, and it's pathos score"""
-    absent = find_absents(text, old_lexicon)
+def lexicon_deltas(text: Union[str, document.Document], pathos: float, negative_sentiment: bool,
+                   old_lexicon: Mapping[str, int]) -> dict[str, tuple[float, int]]:
+    """Return the (sentiment_sum, word_count) updates that learning from the given text adds to the AI lexicon.
 
-    for word in absent:
-        if not present_in_file(word, 'data/ai_lexicon.csv'):
-            with open('data/ai_lexicon.csv', 'a', newline='') as file:
-                if negative_sentiment:
-                    pathos = 0 - pathos
-                writer = csv.writer(file)
-                writer.writerow([word, pathos, 1])  # word, sentiment_count, word_count
-        else:
-            with open('data/ai_lexicon.csv', 'r', newline='') as file:
-                reader = csv.reader(file)
-                rows = []
-                for row in reader:
-                    if word in row:
-                        if negative_sentiment:
-                            pathos = 0 - pathos
-                        rows.append([word, str((float(row[1]) + pathos)),
-                                     str(float(row[2]) + 1)])
-                    else:
-                        rows.append(row)
-
-            with open('data/ai_lexicon1.csv', 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerows(rows)
-
-            os.remove('data/ai_lexicon.csv')
-            os.rename('data/ai_lexicon1.csv', 'data/ai_lexicon.csv')
-
-
-def initial_pathos_to_tuple(node: tuple) -> int:
+    Every occurrence of a word missing from old_lexicon adds the text's pathos score to that word's sentiment sum
+    (negated if the text has negative sentiment) and 1 to its count.
+    """
+    if negative_sentiment:
+        pathos = 0 - pathos
+    deltas = {}
+    for word in find_absents(text, old_lexicon):
+        sentiment_sum, word_count = deltas.get(word, (0, 0))
+        deltas[word] = (sentiment_sum + pathos, word_count + 1)
+    return deltas
+
+
+def update_lexicon_data_ai(text: Union[str, document.Document], pathos: float, negative_sentiment: bool,
+                           old_lexicon: Mapping[str, int]) -> None:
+    """ This function will update the lexicon based on the missing words, and it's pathos score
+
+    The updates are appended to the AI lexicon's delta log rather than rewriting data/ai_lexicon.csv.
+    """
+    ai_lexicon.get_ai_lexicon().record_many(lexicon_deltas(text, pathos, negative_sentiment, old_lexicon))
+
+
+def initial_pathos_to_tuple(node: tuple, lexicon: Optional[sentiment_lexicon.LexiconSnapshot] = None) -> int:
     """Return the sentiment (pathos) scores of the given node
 
+    If no lexicon is given, the shared snapshot is used.
+
     >>> initial_pathos_to_tuple(('happy', 'aaa', 'bbb', 'ccc'))
     1
     """
-    lexicon = create_lexicon()
-    if node[0] in lexicon:
-        return lexicon[node[0]]
-    else:
-        return 0
+    if lexicon is None:
+        lexicon = sentiment_lexicon.get_lexicon()
+    return lexicon.score(node[0])
 
 
-def initial_pathos_to_tuple_ai(node: tuple, text: str) -> Union[int, float]:
+def initial_pathos_to_tuple_ai(node: tuple, text: Union[str, document.Document],
+                               lexicon: Optional[Mapping[str, Union[int, float]]] = None) -> Union[int, float]:
     """ Return the sentiment (pathos) scores of the given node
 
-    Uses an AI lexicon.
+    Uses an AI lexicon. If no lexicon is given, it is created from the text with create_lexicon_ai.
     """
-    lexicon = create_lexicon_ai(text, old_lexicon=create_lexicon())
+    if lexicon is None:
+        lexicon = create_lexicon_ai(text, old_lexicon=sentiment_lexicon.get_lexicon().words)
     if node[0] in lexicon:
         return lexicon[node[0]]
     else:
@@ -173,7 +150,7 @@ def count_logos(text: str) -> int:
     return sum(process.count_logos_numerals(text))
 
 
-def get_logos(text: str) -> Union[float, int]:
+def get_logos(text: Union[str, document.Document]) -> Union[float, int]:
     """Return a logos score for a given text.
 
     Logos scores are in the range 0 to 1. A score of 0 indicates the absence of logos. A score of 1 indicates a
@@ -184,14 +161,16 @@ def get_logos(text: str) -> Union[float, int]:
     If a text contains reasoning, logos_score = 0.5 + average_count,
     where average count is the average number of counts per sentence in the text, scaled to a float between 0 and 0.5
     """
-    if process.is_reasoning_text(text):
-        count = count_logos(text) / len(process.text_to_sentences(text))
+    parsed = document.as_document(text)
+    if process.is_reasoning_text(parsed.text):
+        # All of a reasoning text's numerals are logos numerals (see process.count_logos_numerals).
+        count = sum(process.count_numerals(sentence) for sentence in parsed.sentences) / len(parsed.sentences)
         return min(0.5 + count, 1.0)
     else:
         return 0.0
 
 
-def get_pathos(text: str) -> tuple[Union[float, int], bool]:
+def get_pathos(text: Union[str, document.Document]) -> tuple[Union[float, int], bool]:
     """Return the pathos score for the given text alongside its direction.
 
     The pathos score for a given text is the average of the pathos scores of all the roots of its
@@ -199,8 +178,7 @@ def get_pathos(text: str) -> tuple[Union[float, int], bool]:
 
     The pathos score should be rounded to the nearest 100th.
     """
-    sentences = process.process_text(text)
-    trees = parse_tree.trees_from_sentences(sentences)
+    trees = document.as_document(text).trees()
     for tree in trees:
         tree.final_pathos_of_tree()
     pathos_score = sum([(parsetree.get_pathos()[0]) for parsetree in trees]) / max(len(trees), 1)
@@ -208,7 +186,7 @@ def get_pathos(text: str) -> tuple[Union[float, int], bool]:
     return pathos_score, negative_sentiment_present
 
 
-def get_pathos_ai(text: str) -> (float, bool):
+def get_pathos_ai(text: Union[str, document.Document]) -> (float, bool):
     """Returns the pathos score for the given text alongside its direction (a '+' or '-' or 'undetermined').
 
     The pathos score for a given text is the average of the pathos scores of all the roots of its
@@ -216,11 +194,12 @@ def get_pathos_ai(text: str) -> (float, bool):
 
     Uses AI.
     """
-    sentences = process.process_text(text)
-    trees = parse_tree.trees_from_sentences(sentences)
-    for tree in trees:
-        tree.final_pathos_of_tree_ai(text)
-    pathos = [tree.get_pathos() for tree in trees]
+    parsed = document.as_document(text)
+    trees = parsed.trees()
+    with metrics.stage('pathos'):
+        for tree in trees:
+            tree.final_pathos_of_tree_ai(parsed)
+        pathos = [tree.get_pathos() for tree in trees]
     pathos_score = sum([result[0] for result in pathos]) / max(len(trees), 1)
     negative_sentiment_present = any(result[1] for result in pathos)
     return pathos_score, negative_sentiment_present
@@ -279,20 +258,50 @@ def find_problematic_buzzwords() -> list:
     return buzzwords
 
 
-def count_problematic_buzzwords(text: str) -> int:
+def count_problematic_buzzwords(text: Union[str, document.Document]) -> int:
     """Returns a count of the number of problematic buzzwords in the given text
     """
-    buzzwords = find_problematic_buzzwords()
-    buzzword_count = {word: text.count(word) for word in buzzwords}
-    return sum(buzzword_count[buzzword] for buzzword in buzzword_count)
+    return buzzword_matcher().total(document.as_document(text).text)
+
+
+def problematic_buzzword_counts(text: Union[str, document.Document]) -> dict[str, int]:
+    """Returns how many times each problematic buzzword that occurs in the given text occurs in it
+
+    >>> problematic_buzzword_counts('The beta cuck said beta things')
+    {'beta': 2, 'cuck': 1}
+    """
+    counts = buzzword_matcher().counts(document.as_document(text).text)
+    return {buzzword: counts[buzzword] for buzzword in counts if counts[buzzword] > 0}
 
 
-def ethics_warning(text: str) -> str:
+@functools.lru_cache(maxsize=None)
+def buzzword_matcher() -> phrase_matcher.PhraseMatcher:
+    """Returns a matcher for the problematic buzzwords, compiled the first time it is needed.
+
+    Buzzwords are matched with their case, like str.count.
+    """
+    return phrase_matcher.PhraseMatcher(find_problematic_buzzwords())
+
+
+def has_ethics_warning(text: Union[str, document.Document]) -> bool:
+    """Return whether the text likely expresses views harmful to marginalized groups, i.e. whether ethics_warning
+    warns about it. A text without any sentences has nothing to warn about.
+
+    >>> has_ethics_warning('!!!')
+    False
+    """
+    parsed = document.as_document(text)
+    if not parsed.sentences:
+        return False
+    with metrics.stage('ethics'):
+        return count_problematic_buzzwords(parsed) / len(parsed.sentences) > 0.1
+
+
+def ethics_warning(text: Union[str, document.Document]) -> str:
     """Return an ethics warning if and only if the text likely expresses views harmful to marginalized
     groups
     """
-    sentences_count = len(process.text_to_sentences(text))
-    if count_problematic_buzzwords(text) / sentences_count > 0.1:
+    if has_ethics_warning(text):
         return "WARNING: This post may express dangerous sentiments towards marginalized groups. Think critically " \
                "about this post and remember to show respect to other people, regardless of your differences."
     else:
@@ -342,7 +351,8 @@ def get_negative_sentiment(scores: tuple[Union[float, int], Union[float, int], U
         return text1 + " " + text2
 
 
-def get_compellingness(text: str) -> tuple[Union[float, int], Union[float, int], Union[float, int], bool]:
+def get_compellingness(text: Union[str, document.Document]) \
+        -> tuple[Union[float, int], Union[float, int], Union[float, int], bool]:
     """Return the compellingess score of the given text and its direction (a '+' or '-' or 'undetermined').
 
     This function uses the following piecewise formula:
@@ -371,18 +381,23 @@ def get_compellingness(text: str) -> tuple[Union[float, int], Union[float, int],
     >>> get_compellingness("Because of the failure of Congress, 76 people lost their lives.")
     (2.0, 1.0, 1.5, True)
     """
-    pathos = get_pathos(text)
-    pathos_score = pathos[1]
-    logos_score = get_logos(text)
+    parsed = document.as_document(text)
+    pathos = get_pathos(parsed)
+    pathos_score = pathos[0]
+    logos_score = get_logos(parsed)
     initial_compellingness = max(logos_score, pathos_score) + 0.5 * min(logos_score, pathos_score)
     if initial_compellingness > 2.0:
         compellingness = 2.0
     else:
         compellingness = initial_compellingness
+    if metrics.is_enabled():
+        metrics.TEXTS_SCORED.inc('standard')
+        metrics.SENTENCES_PER_TEXT.observe(len(parsed.sentences))
     return compellingness, pathos_score, logos_score, pathos[1]
 
 
-def get_compellingness_ai(text: str) -> tuple[Union[float, int], Union[float, int], Union[float, int], bool]:
+def get_compellingness_ai(text: Union[str, document.Document]) \
+        -> tuple[Union[float, int], Union[float, int], Union[float, int], bool]:
     """Return the compellingess score of the given text and its direction (a '+' or '-' or 'undetermined').
 
     This function uses the following piecewise formula:
@@ -396,18 +411,35 @@ def get_compellingness_ai(text: str) -> tuple[Union[float, int], Union[float, in
 
     Uses AI
     """
-    pathos = get_pathos_ai(text)
+    scores, deltas = get_compellingness_ai_deltas(text)
+    with metrics.stage('lexicon_update'):
+        ai_lexicon.get_ai_lexicon().record_many(deltas)
+    return scores
+
+
+def get_compellingness_ai_deltas(text: Union[str, document.Document]) \
+        -> tuple[tuple[Union[float, int], Union[float, int], Union[float, int], bool],
+                 dict[str, tuple[float, int]]]:
+    """Return get_compellingness_ai of the given text together with the updates that learning from it adds to the
+    AI lexicon (see lexicon_deltas), without recording them.
+    """
+    parsed = document.as_document(text)
+    pathos = get_pathos_ai(parsed)
     pathos_score = pathos[0]
     negative_sentiment = pathos[1]
-    logos_score = get_logos(text)
+    with metrics.stage('logos'):
+        logos_score = get_logos(parsed)
     initial_compellingness = max(logos_score, pathos_score) + 0.5 * min(logos_score, pathos_score)
     if initial_compellingness > 2.0:
         compellingness = 2.0
     else:
         compellingness = initial_compellingness
 
-    update_lexicon_data_ai(text, pathos_score, negative_sentiment, create_lexicon())
-    return compellingness, pathos_score, logos_score, negative_sentiment
+    deltas = lexicon_deltas(parsed, pathos_score, negative_sentiment, sentiment_lexicon.get_lexicon().words)
+    if metrics.is_enabled():
+        metrics.TEXTS_SCORED.inc('ai')
+        metrics.SENTENCES_PER_TEXT.observe(len(parsed.sentences))
+    return (compellingness, pathos_score, logos_score, negative_sentiment), deltas
 
 
 def get_compellingness_description(scores: tuple[Union[float, int], Union[float, int], Union[float, int], bool]) -> str:
@@ -423,7 +455,7 @@ def get_compellingness_description(scores: tuple[Union[float, int], Union[float,
         return "This text achieved the highest compellingness score category."
 
 
-def compellingness_with_description(text: str) -> tuple[str, str, str, str, str, str]:
+def compellingness_with_description(text: Union[str, document.Document]) -> tuple[str, str, str, str, str, str]:
     """Returns descriptions of the scores given in get_compellingness as well as any ethics warnings.
 
     Preconditions:
@@ -432,17 +464,11 @@ def compellingness_with_description(text: str) -> tuple[str, str, str, str, str,
     - scores[2] is the logos score
     - [score <= 2 for score in scores]
     """
-    scores = get_compellingness(text)
-    compellingness_summary = "The compellingness score for the text was: " + str(round(scores[0], 2)) + '\n'
-    pathos_summary = "The pathos score for the text was: " + str(round(scores[1], 2)) + '\n'
-    logos_summary = "The logos score for the text was: " + str(round(scores[2], 2)) + '\n'
-    results_summary = compellingness_summary + pathos_summary + logos_summary
-
-    return results_summary, get_compellingness_description(scores), get_pathos_description(scores), \
-        get_logos_description(scores), get_negative_sentiment(scores), ethics_warning(text)
+    parsed = document.as_document(text)
+    return describe_compellingness(parsed, get_compellingness(parsed))
 
 
-def compellingness_description_ai(text: str) -> tuple[str, str, str, str, str, str]:
+def compellingness_description_ai(text: Union[str, document.Document]) -> tuple[str, str, str, str, str, str]:
     """Returns descriptions of the scores given in get_compellingness as well as any ethics warnings,
     except if it encounters
 
@@ -453,7 +479,15 @@ def compellingness_description_ai(text: str) -> tuple[str, str, str, str, str, s
     - [score <= 2 for score in scores]
 
     """
-    scores = get_compellingness_ai(text)
+    parsed = document.as_document(text)
+    return describe_compellingness(parsed, get_compellingness_ai(parsed))
+
+
+def describe_compellingness(text: Union[str, document.Document],
+                            scores: tuple[Union[float, int], Union[float, int], Union[float, int], bool]) \
+        -> tuple[str, str, str, str, str, str]:
+    """Returns descriptions of the given compellingness scores of the given text as well as any ethics warnings.
+    """
     compellingness_summary = "The compellingness score for the text was: " + str(round(scores[0], 2)) + '\n'
     pathos_summary = "The pathos score for the text was: " + str(round(scores[1], 2)) + '\n'
     logos_summary = "The logos score for the text was: " + str(round(scores[2], 2)) + '\n'
@@ -463,6 +497,93 @@ def compellingness_description_ai(text: str) -> tuple[str, str, str, str, str, s
         get_logos_description(scores), get_negative_sentiment(scores), ethics_warning(text)
 
 
+def analyze_many(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE, n_process: int = 1,
+                 ai: bool = False, describe: bool = False) -> list[tuple]:
+    """Return the compellingness scores of each of the given texts, in the same order as the texts.
+
+    This gives the same results as calling get_compellingness (or get_compellingness_ai if ai is True) on each text
+    in turn, but the sentences of all the texts are parsed together by spaCy in batches of batch_size sentences,
+    spread over n_process processes. If describe is True, the descriptions returned by
+    compellingness_with_description (or compellingness_description_ai) are returned instead of the scores.
+
+    In AI mode, the texts are still scored and learned from one at a time and in order, so each text sees what was
+    learned from the texts before it.
+    """
+    results = []
+    for parsed in iter_parsed(texts, batch_size, n_process):
+        if ai:
+            scores = get_compellingness_ai(parsed)
+        else:
+            scores = get_compellingness(parsed)
+
+        if describe:
+            results.append(describe_compellingness(parsed, scores))
+        else:
+            results.append(scores)
+    return results
+
+
+def iter_parsed(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                n_process: int = 1) -> Iterator[document.Document]:
+    """Yield a parsed Document for each of the given texts, in order.
+
+    The sentences of all the texts are parsed together by spaCy in batches of batch_size sentences, spread over
+    n_process processes. The texts are read lazily, and each document is yielded as soon as its last sentence has
+    been parsed, so a long stream of texts can be scored while it is still being read.
+    """
+    pending = collections.deque()
+
+    def all_sentences() -> Iterator[str]:
+        for text in texts:
+            parsed = document.Document(text)
+            pending.append((parsed, []))
+            yield from parsed.processed_sentences
+
+    for doc in parse_tree.parse_sentences(all_sentences(), batch_size=batch_size, n_process=n_process):
+        # Texts without sentences are complete before any of their sentences are parsed.
+        while len(pending[0][0].processed_sentences) == 0:
+            yield _with_docs(*pending.popleft())
+        pending[0][1].append(doc)
+        if len(pending[0][1]) == len(pending[0][0].processed_sentences):
+            yield _with_docs(*pending.popleft())
+    while pending:
+        yield _with_docs(*pending.popleft())
+
+
+def _with_docs(parsed: document.Document, docs: list[Any]) -> document.Document:
+    """Return the given document after giving it the given spaCy Docs of its sentences."""
+    parsed.docs = docs
+    return parsed
+
+
+def get_compellingness_many(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                            n_process: int = 1) -> list[tuple[Union[float, int], Union[float, int],
+                                                              Union[float, int], bool]]:
+    """Return get_compellingness of each of the given texts, parsing them in batches (see analyze_many)."""
+    return analyze_many(texts, batch_size, n_process)
+
+
+def get_compellingness_ai_many(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                               n_process: int = 1) -> list[tuple[Union[float, int], Union[float, int],
+                                                                 Union[float, int], bool]]:
+    """Return get_compellingness_ai of each of the given texts, parsing them in batches (see analyze_many)."""
+    return analyze_many(texts, batch_size, n_process, ai=True)
+
+
+def compellingness_with_description_many(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                                         n_process: int = 1) -> list[tuple[str, str, str, str, str, str]]:
+    """Return compellingness_with_description of each of the given texts, parsing them in batches
+    (see analyze_many)."""
+    return analyze_many(texts, batch_size, n_process, describe=True)
+
+
+def compellingness_description_ai_many(texts: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                                       n_process: int = 1) -> list[tuple[str, str, str, str, str, str]]:
+    """Return compellingness_description_ai of each of the given texts, parsing them in batches
+    (see analyze_many)."""
+    return analyze_many(texts, batch_size, n_process, ai=True, describe=True)
+
+
 if __name__ == '__main__':
     import doctest
 
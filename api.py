@@ -0,0 +1,134 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the JSON API, a Flask blueprint registered by app.py, for scoring many texts over one connection.
+
+POST /api/v1/score takes either a JSON array or an NDJSON stream (Content-Type application/x-ndjson, one JSON value
+per line) of texts. Each text is a string, or an object {"text": ..., "id": ...} whose id is echoed back. A JSON
+body may also be an object {"texts": [...], "ai": true}. AI mode (which scores with, and learns into, the AI
+lexicon) can also be turned on with ?ai=true.
+
+The response is an NDJSON stream with one object per text, sent as soon as that text has been scored:
+
+    {"index": 0, "id": ..., "compellingness": 1.2, "pathos": 1.0, "logos": 0.5, "negative_sentiment": false,
+     "summary": ..., "description": ..., "pathos_description": ..., "logos_description": ...,
+     "negative_sentiment_description": ..., "ethics_warning": ...}
+
+where index is the text's position in the request. A text that cannot be read or scored gets a row
+{"index": ..., "error": ...} instead, and the other texts are still scored.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import collections
+import json
+from typing import Any, Iterable, Iterator
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+import analysis
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/jsonl')
+
+# The number of sentences parsed together (see analysis.iter_parsed). Smaller batches send the first results
+# sooner; larger ones parse faster.
+BATCH_SIZE = 64
+
+
+def _is_true(value: Any) -> bool:
+    """Return whether the given query parameter or JSON value turns a flag on.
+
+    >>> _is_true('true'), _is_true('1'), _is_true(True), _is_true('no'), _is_true(None)
+    (True, True, True, False, False)
+    """
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return value is True
+
+
+def _read_rows() -> tuple[Iterable[Any], bool]:
+    """Return the rows of the current request (read lazily for NDJSON) and whether AI mode was asked for."""
+    ai = _is_true(request.args.get('ai'))
+    if request.mimetype in NDJSON_TYPES:
+        return (json.loads(line) if line.strip() else None for line in request.stream), ai
+
+    body = request.get_json(silent=True)
+    if isinstance(body, dict):
+        return body.get('texts', []), ai or _is_true(body.get('ai'))
+    return body, ai
+
+
+def score_rows(rows: Iterable[Any], ai: bool = False) -> Iterator[dict[str, Any]]:
+    """Yield the result row of each of the given request rows (see the description at the top of this file).
+
+    Blank NDJSON lines (None) are skipped without using up an index.
+    """
+    # The index and id of every row read so far and not yet answered, in order, with the error row of each row
+    # that is not a text, so that the result rows come out in the order of the request rows.
+    pending = collections.deque()
+
+    def valid_texts() -> Iterator[str]:
+        index = 0
+        for row in rows:
+            if row is None:
+                continue
+            text = row.get('text') if isinstance(row, dict) else row
+            row_id = row.get('id') if isinstance(row, dict) else None
+            if isinstance(text, str):
+                pending.append((index, row_id, None))
+                yield text
+            else:
+                pending.append((index, row_id,
+                                _error_row(index, row_id, 'each text must be a string or an object with a "text"')))
+            index += 1
+
+    for parsed in analysis.iter_parsed(valid_texts(), batch_size=BATCH_SIZE):
+        while pending[0][2] is not None:
+            yield pending.popleft()[2]
+        index, row_id, _ = pending.popleft()
+        try:
+            scores = analysis.get_compellingness_ai(parsed) if ai else analysis.get_compellingness(parsed)
+            descriptions = analysis.describe_compellingness(parsed, scores)
+        except Exception as error:  # One bad text must not end the response for the others.
+            yield _error_row(index, row_id, f'{type(error).__name__}: {error}')
+            continue
+        row = {'index': index}
+        if row_id is not None:
+            row['id'] = row_id
+        row.update(zip(('compellingness', 'pathos', 'logos', 'negative_sentiment'), scores))
+        row.update(zip(('summary', 'description', 'pathos_description', 'logos_description',
+                        'negative_sentiment_description', 'ethics_warning'), descriptions))
+        yield row
+    for _, _, error_row in pending:
+        yield error_row
+
+
+def _error_row(index: int, row_id: Any, message: str) -> dict[str, Any]:
+    """Return the result row reporting that the text at the given index could not be scored."""
+    row = {'index': index, 'error': message}
+    if row_id is not None:
+        row['id'] = row_id
+    return row
+
+
+@api.route('/score', methods=['POST'])
+def score():
+    """Score every text in the request and stream back one NDJSON row per text."""
+    rows, ai = _read_rows()
+    if not isinstance(rows, (list, Iterator)):
+        return jsonify({'error': 'The request body must be a JSON array or NDJSON texts.'}), 400
+
+    def lines() -> Iterator[str]:
+        try:
+            for row in score_rows(rows, ai):
+                yield json.dumps(row) + '\n'
+        except ValueError:
+            # A line of the NDJSON stream was not valid JSON; nothing after it can be trusted.
+            yield json.dumps({'error': 'The request body contains a line that is not valid JSON.'}) + '\n'
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
@@ -1,7 +1,30 @@
-from flask import Flask, render_template, request
+import os
+
+from flask import Flask, Response, abort, jsonify, redirect, render_template, request, url_for
+import ai_lexicon
 import analysis
+import api
+import bootstrap
+import document
+import jobs
+import metrics
+import nlp_models
+import result_cache
+import sentiment_lexicon
 
 app = Flask(__name__)
+app.register_blueprint(api.api)
+
+# Fail now, rather than in the first request, if the lexicon or the spaCy model has not been installed.
+bootstrap.preflight(bootstrap.SCORING_NLTK_RESOURCES, [nlp_models.DEFAULT_MODEL])
+
+# Load the spaCy model while the worker boots so that its cost shows up at startup rather than in the first request.
+app.logger.info('Loaded %s in %.2fs', nlp_models.DEFAULT_MODEL, nlp_models.preload())
+
+# Results of recently scored texts. The size and time to live can be set with RESULT_CACHE_SIZE and
+# RESULT_CACHE_TTL (in seconds).
+RESULTS = result_cache.ResultCache(max_size=int(os.environ.get('RESULT_CACHE_SIZE', result_cache.DEFAULT_MAX_SIZE)),
+                                   ttl=float(os.environ.get('RESULT_CACHE_TTL', result_cache.DEFAULT_TTL)))
 
 
 @app.route('/')
@@ -11,19 +34,131 @@ def index():
 
 @app.route('/launch')
 def launch():
-    return render_template('launch.html')
+    return render_template('launch.html', async_submit=ASYNC_SUBMIT)
+
+
+def score_text(text: str) -> dict:
+    """Return everything the results page shows about the given (normalised) text, scoring it unless its result is
+    cached, and teach the AI lexicon about it either way.
+
+    >>> lexicon = ai_lexicon.MemoryAILexicon()
+    >>> ai_lexicon.set_ai_lexicon(lexicon)
+    >>> hits = RESULTS.stats()['hits']
+    >>> first = score_text('The tennis court was covered up with some tents.')
+    >>> learned = lexicon.entries()
+    >>> score_text('The tennis court was covered up with some tents.') == first
+    True
+    >>> RESULTS.stats()['hits'] - hits
+    1
+    >>> all(lexicon.entries()[word][1] == 2 * count for word, (_, count) in learned.items())
+    True
+    """
+    # The AI lexicon learns from nearly every text, so keying results by its version would mean a repeated text is
+    # never found. Results are keyed by the sentiment lexicon's version only and kept with what scoring taught the
+    # AI lexicon, which is recorded again on every hit: a repeated text still teaches the lexicon as it always has,
+    # but is shown the scores it got the first time until its entry expires.
+    key = result_cache.cache_key(text, sentiment_lexicon.get_lexicon().version())
+    cached = RESULTS.get(key)
+    if cached is None:
+        # Split and parse the text once and share the result between all the scores below.
+        parsed = document.Document(text)
+        result, deltas = analysis.get_compellingness_ai_deltas(parsed)
+        results = {'result': result,
+                   'descriptions': analysis.get_compellingness_description(result),
+                   'warnings': analysis.ethics_warning(parsed),
+                   'pathos': analysis.get_pathos_description(result),
+                   'logos': analysis.get_logos_description(result)}
+        RESULTS.put(key, (results, deltas))
+    else:
+        results, deltas = cached
+    ai_lexicon.get_ai_lexicon().record_many(deltas)
+    return results
 
 
 @app.route('/submit', methods=['POST'])
 def submit():
-    text = request.form['text']
+    text = result_cache.normalize_text(request.form['text'])
     show_loading_overlay = True
-    result = analysis.get_compellingness_ai(text)
-    descriptions = analysis.get_compellingness_description(result)
-    warnings = analysis.ethics_warning(text)
-    pathos = analysis.get_pathos_description(result)
-    logos = analysis.get_logos_description(result)
-    return render_template('results.html', text=text, result=result, descriptions=descriptions, warnings=warnings, pathos=pathos, logos=logos, show_loading_overlay=show_loading_overlay)
+    return render_template('results.html', text=text, show_loading_overlay=show_loading_overlay, **score_text(text))
+
+
+def run_job(text: str) -> dict:
+    """Score the given text for a background job."""
+    return dict(score_text(text), text=text)
+
+
+# Scores texts in the background for /jobs. Set ASYNC_SUBMIT=1 to make the launch page use it; JOB_WORKERS and
+# JOB_QUEUE_SIZE bound the worker threads and the jobs waiting for them, and JOB_STORE (see jobs.py) chooses where
+# job results are kept.
+ASYNC_SUBMIT = os.environ.get('ASYNC_SUBMIT', '0') == '1'
+# What the browser is told when a job fails. The error itself is logged (see jobs.JobQueue) but not shown, since it
+# may include file paths and library internals.
+JOB_FAILED_MESSAGE = 'Sorry, this text could not be analyzed. Please try again.'
+JOBS = jobs.JobQueue(run_job, workers=int(os.environ.get('JOB_WORKERS', jobs.DEFAULT_WORKERS)),
+                     max_pending=int(os.environ.get('JOB_QUEUE_SIZE', jobs.DEFAULT_MAX_PENDING)),
+                     store=jobs.store_from_environment())
+
+
+# What /metrics reports besides the scorer's own timings: the AI lexicon's size, the result cache's counts and the
+# number of pending jobs. Set METRICS=1 to record the timings and request counts (see metrics.py).
+metrics.register_gauge('compel_ai_lexicon_words', 'Words in the AI lexicon.', lambda: len(ai_lexicon.get_ai_lexicon()))
+metrics.register_gauge('compel_result_cache_lookups_total', 'Result cache lookups, by outcome.',
+                       lambda: {outcome: RESULTS.stats()[outcome] for outcome in ('hits', 'misses')},
+                       label='outcome', kind='counter')
+metrics.register_gauge('compel_result_cache_evictions_total', 'Results evicted from the result cache.',
+                       lambda: RESULTS.stats()['evictions'], kind='counter')
+metrics.register_gauge('compel_result_cache_entries', 'Results in the result cache.', lambda: len(RESULTS))
+metrics.register_gauge('compel_jobs_pending', 'Jobs queued or running.', JOBS.pending)
+
+
+@app.before_request
+def count_request():
+    metrics.HTTP_REQUESTS.inc(request.endpoint or 'unknown')
+
+
+@app.route('/metrics')
+def show_metrics():
+    """Return the scorer's metrics in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue the posted text for scoring and return the new job's id and where to poll for its result."""
+    text = result_cache.normalize_text(request.form['text'])
+    try:
+        job_id = JOBS.submit(text)
+    except jobs.QueueFullError:
+        return jsonify({'error': 'Too many texts are waiting to be analyzed. Please try again shortly.'}), 503
+    return jsonify({'id': job_id, 'status': jobs.QUEUED, 'result_url': url_for('job_result', job_id=job_id),
+                    'report_url': url_for('job_report', job_id=job_id)}), 202
+
+
+@app.route('/result/<job_id>')
+def job_result(job_id: str):
+    """Return the status of a job, and its result once it is done, as JSON.
+
+    This answers at once, so that polling never ties up a server thread; clients poll again until the job is done.
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'No such job.'}), 404
+    if job['status'] == jobs.FAILED:
+        job = dict(job, error=JOB_FAILED_MESSAGE)
+    return jsonify(job)
+
+
+@app.route('/report/<job_id>')
+def job_report(job_id: str):
+    """Show the results page for a finished job."""
+    job = JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    if job['status'] == jobs.FAILED:
+        abort(500, JOB_FAILED_MESSAGE)
+    if job['status'] != jobs.DONE:
+        return redirect(url_for('launch'))
+    return render_template('results.html', show_loading_overlay=True, **job['result'])
 
 
 if __name__ == '__main__':
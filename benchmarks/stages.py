@@ -0,0 +1,265 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file times each stage of the scoring pipeline on its own, on sentences from texts.txt and on synthetic posts,
+and compares the result with a recorded baseline:
+
+    python benchmarks/stages.py                  # report the time of each stage
+    python benchmarks/stages.py --save           # record the results as the baseline
+    python benchmarks/stages.py --check          # exit with status 1 if a stage got slower than its baseline by
+                                                 # more than the threshold
+    python benchmarks/stages.py get_logos ethics_warning --repeat 9
+
+Each stage is run once to warm up its caches and then repeat times, and the median is reported. A stage's input is
+prepared before it is timed, so only the stage itself is measured; stages that change their input (scoring a tree
+changes its sentiments) get a new copy for every run. Stages are compared by their time per item (sentence, tree
+or text), so the baseline still applies when --limit changes.
+
+Nothing is downloaded: the spaCy pipeline and the NLTK data must already be installed (see bootstrap.py). The AI
+lexicon is never changed; the AI stages read and write a temporary copy of data/ai_lexicon.csv. Baselines depend
+on the machine, so record one on the machine the numbers are tracked on.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import itertools
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, NamedTuple, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmarks', 'stages_baseline.json')
+TEXTS_FILE = os.path.join(REPO_DIR, 'texts.txt')
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import ai_lexicon
+import analysis
+import bootstrap
+import document
+import nlp_models
+import parse_tree
+import process
+import sentiment_lexicon
+
+# How much slower than its baseline (as a fraction) a stage may get before --check fails.
+DEFAULT_THRESHOLD = 0.25
+
+# The default number of sentences read from texts.txt, and of synthetic posts.
+DEFAULT_LIMIT = 200
+DEFAULT_SYNTHETIC = 100
+
+# The words synthetic posts are made of: sentiment words, intensifiers, negations, superlatives, numerals and
+# reasoning words, so that every branch of the scorer is exercised.
+SYNTHETIC_WORDS = ('the', 'people', 'school', 'government', 'plan', 'market', 'city', 'is', 'was', 'are', 'has',
+                   'very', 'really', 'extremely', 'not', "n't", 'good', 'bad', 'happy', 'sad', 'terrible',
+                   'wonderful', 'best', 'worst', 'happiest', '13', '57', '2023', 'twenty', 'because', 'therefore',
+                   'since', 'so', 'and', 'but', 'we', 'they', 'should', 'buy', 'care', 'help')
+
+
+class Stage(NamedTuple):
+    """A stage of the pipeline to time.
+
+    Instance Attributes:
+        - name: The name the stage is reported and recorded under.
+        - prepare: Returns the input of one run of the stage. It is not timed.
+        - run: Runs the stage on an input returned by prepare and returns the number of items it handled.
+    """
+    name: str
+    prepare: Callable[[], Any]
+    run: Callable[[Any], int]
+
+
+def corpus_texts(limit: int = DEFAULT_LIMIT, texts_file: str = TEXTS_FILE) -> list[str]:
+    """Return texts of five consecutive sentences each, made of the first limit sentences of the given file."""
+    with open(texts_file, encoding='utf-8') as file:
+        sentences = [sentence.strip() for sentence in itertools.islice(process.iter_sentences(file), limit)]
+    return ['. '.join(sentences[i:i + 5]) + '.' for i in range(0, len(sentences), 5)]
+
+
+def synthetic_texts(count: int = DEFAULT_SYNTHETIC, seed: int = 111) -> list[str]:
+    """Return count posts of one to four random sentences of SYNTHETIC_WORDS, the same for the same seed.
+
+    >>> synthetic_texts(2) == synthetic_texts(2)
+    True
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        sentences = [' '.join(rng.choice(SYNTHETIC_WORDS) for _ in range(rng.randrange(4, 16)))
+                     for _ in range(rng.randrange(1, 5))]
+        texts.append(''.join(sentence.capitalize() + rng.choice('.!?') + ' ' for sentence in sentences).strip())
+    return texts
+
+
+def build_stages(texts: list[str], scratch_dir: str) -> list[Stage]:
+    """Return the stages to time on the given texts, parsing them once. The AI lexicon stages use copies of the
+    AI lexicon made in the given directory."""
+    docs = [list(parse_tree.parse_sentences(process.process_text(text))) for text in texts]
+    sentences = [sentence for text in texts for sentence in process.process_text(text)]
+    # impose_tree_struct_on_list finds nodes by their word, and never returns if a word appears twice.
+    tree_lists = [tree_list for tree_list in (parse_tree.tree_list_from_doc(doc) for text_docs in docs
+                                              for doc in text_docs)
+                  if len({entry[0][0] for entry in tree_list}) == len(tree_list)]
+    old_lexicon = sentiment_lexicon.get_lexicon().words
+    copies = itertools.count()
+
+    def documents() -> list[document.Document]:
+        return [document.Document(text, text_docs) for text, text_docs in zip(texts, docs)]
+
+    def trees() -> list[parse_tree.ParseTree]:
+        return [tree for text_docs in docs for doc in text_docs for tree in parse_tree.trees_from_doc(doc)]
+
+    def trees_with_documents() -> list[tuple[parse_tree.ParseTree, document.Document]]:
+        return [(tree, parsed) for parsed in documents() for tree in parsed.trees()]
+
+    def learning_inputs() -> list[tuple[document.Document, float, bool]]:
+        # A new copy of the lexicon for every run, so each run learns the same words.
+        copy = os.path.join(scratch_dir, f'ai_lexicon_{next(copies)}.csv')
+        shutil.copyfile(ai_lexicon.AI_LEXICON_FILE, copy)
+        ai_lexicon.set_ai_lexicon(ai_lexicon.AILexicon(copy))
+        return [(parsed, *analysis.get_pathos(parsed)) for parsed in documents()]
+
+    def score_trees(items: list[parse_tree.ParseTree]) -> int:
+        for tree in items:
+            tree.final_pathos_of_tree()
+        return len(items)
+
+    def score_trees_ai(items: list[tuple[parse_tree.ParseTree, document.Document]]) -> int:
+        for tree, parsed in items:
+            tree.final_pathos_of_tree_ai(parsed)
+        return len(items)
+
+    def learn(items: list[tuple[document.Document, float, bool]]) -> int:
+        for parsed, pathos, negative_sentiment in items:
+            analysis.update_lexicon_data_ai(parsed, pathos, negative_sentiment, old_lexicon)
+        return len(items)
+
+    return [
+        Stage('process_text', lambda: texts, lambda items: sum(len(process.process_text(text)) for text in items)),
+        Stage('tree_list_from_sentence', lambda: sentences,
+              lambda items: len([parse_tree.tree_list_from_sentence(sentence) for sentence in items])),
+        Stage('impose_tree_struct_on_list', lambda: tree_lists,
+              lambda items: len([parse_tree.impose_tree_struct_on_list(tree_list) for tree_list in items])),
+        Stage('final_pathos_of_tree', trees, score_trees),
+        Stage('final_pathos_of_tree_ai', trees_with_documents, score_trees_ai),
+        Stage('get_logos', documents, lambda items: len([analysis.get_logos(parsed) for parsed in items])),
+        Stage('ethics_warning', documents, lambda items: len([analysis.ethics_warning(parsed) for parsed in items])),
+        Stage('update_lexicon_data_ai', learning_inputs, learn),
+    ]
+
+
+def measure(stage: Stage, repeat: int = 5) -> dict[str, Any]:
+    """Run the given stage once to warm up and then repeat times, and return the median time of a run and of one
+    item."""
+    stage.run(stage.prepare())
+    times = []
+    items = 0
+    for _ in range(repeat):
+        data = stage.prepare()
+        start = time.perf_counter()
+        items = stage.run(data)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+    return {'stage': stage.name, 'items': items, 'seconds': seconds,
+            'item_microseconds': seconds / max(items, 1) * 1e6}
+
+
+def run(names: Optional[list[str]] = None, repeat: int = 5, limit: int = DEFAULT_LIMIT,
+        synthetic: int = DEFAULT_SYNTHETIC) -> list[dict[str, Any]]:
+    """Time the stages with the given names (by default, all of them) on limit sentences of texts.txt and on
+    synthetic posts, and return their results.
+
+    Raise bootstrap.MissingResourceError if the spaCy pipeline or the NLTK data is not installed.
+    """
+    bootstrap.preflight(bootstrap.SCORING_NLTK_RESOURCES, [nlp_models.DEFAULT_MODEL])
+    texts = corpus_texts(limit) + synthetic_texts(synthetic)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        copy = os.path.join(scratch_dir, 'ai_lexicon.csv')
+        shutil.copyfile(ai_lexicon.AI_LEXICON_FILE, copy)
+        ai_lexicon.set_ai_lexicon(ai_lexicon.AILexicon(copy))
+        stages = build_stages(texts, scratch_dir)
+        unknown = set(names or []) - {stage.name for stage in stages}
+        if unknown:
+            raise ValueError('Unknown stages: ' + ', '.join(sorted(unknown)))
+        return [measure(stage, repeat) for stage in stages if not names or stage.name in names]
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Return a message for every result whose time per item exceeds its baseline by more than the threshold.
+
+    >>> compare([{'stage': 'get_logos', 'item_microseconds': 30.0}], {'get_logos': {'item_microseconds': 20.0}})
+    ['get_logos: 30.0us per item, baseline 20.0us (+50%)']
+    """
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['stage'])
+        if previous is None or not previous.get('item_microseconds'):
+            continue
+        if result['item_microseconds'] > previous['item_microseconds'] * (1 + threshold):
+            change = result['item_microseconds'] / previous['item_microseconds'] - 1
+            regressions.append(f"{result['stage']}: {result['item_microseconds']:.1f}us per item, "
+                               f"baseline {previous['item_microseconds']:.1f}us (+{change:.0%})")
+    return regressions
+
+
+def report(results: list[dict[str, Any]], baseline: Optional[dict[str, dict[str, Any]]] = None) -> str:
+    """Return a readable table of the given results, with their baselines if given."""
+    lines = []
+    for result in results:
+        line = (f"{result['stage']:<28} {result['seconds']:.4f}s  {result['items']:>5} items  "
+                f"{result['item_microseconds']:>10.1f}us/item")
+        if baseline and result['stage'] in baseline:
+            line += f"  (baseline {baseline[result['stage']]['item_microseconds']:.1f}us/item)"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Time each stage of the scoring pipeline.')
+    parser.add_argument('stages', nargs='*', help='the stages to time (default: all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='sentences read from texts.txt')
+    parser.add_argument('--synthetic', type=int, default=DEFAULT_SYNTHETIC, help='synthetic posts')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='fail if a stage regressed')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    # The data files are found relative to the repository.
+    os.chdir(REPO_DIR)
+    try:
+        measured = run(args.stages, args.repeat, args.limit, args.synthetic)
+    except (bootstrap.MissingResourceError, ValueError) as error:
+        sys.exit(str(error))
+    recorded = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            recorded = json.load(file)
+
+    print(json.dumps(measured, indent=2) if args.json else report(measured, recorded))
+    if args.save:
+        # Stages that were not timed this time keep their recorded baseline.
+        with open(args.baseline, 'w') as file:
+            json.dump({**(recorded or {}), **{result['stage']: result for result in measured}}, file, indent=2)
+    if args.check:
+        if recorded is None:
+            sys.exit('No baseline recorded in ' + args.baseline + '; run with --save first.')
+        problems = compare(measured, recorded, args.threshold)
+        if problems:
+            sys.exit('Stage regressions:\n' + '\n'.join(problems))
@@ -0,0 +1,163 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file measures how long the project's entry points take to import in a fresh interpreter (their cold-start
+time), using Python's -X importtime, and compares the result with a recorded baseline:
+
+    python benchmarks/startup.py                 # report the import time of each entry point
+    python benchmarks/startup.py --save          # record the results as the baseline
+    python benchmarks/startup.py --check         # exit with status 1 if an entry point got slower than its
+                                                 # baseline by more than the threshold
+
+Each module is imported several times and the median is reported, together with the imports that took longest.
+Baselines depend on the machine, so record one on the machine the numbers are tracked on.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Optional
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, 'benchmarks', 'startup_baseline.json')
+
+# The web app, the scoring API it and the command-line tools use, and the tweet report.
+MODULES = ('app', 'analysis', 'document', 'main')
+
+# How much slower than its baseline (as a fraction) an entry point may get before --check fails.
+DEFAULT_THRESHOLD = 0.25
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Return the (module, depth, self microseconds, cumulative microseconds) of every import reported by
+    -X importtime in the given output, in the order they were reported.
+
+    >>> parse_importtime('import time: self [us] | cumulative | imported package\\n'
+    ...                  'import time:       120 |        120 |   re._parser\\n'
+    ...                  'import time:       300 |        420 | re\\n')
+    [('re._parser', 1, 120, 120), ('re', 0, 300, 420)]
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        # Nested imports are indented by two spaces per level, after the one space that follows the '|'.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return imports
+
+
+def measure(module: str, repeat: int = 5, top: int = 5) -> dict[str, Any]:
+    """Import the given module in repeat fresh interpreters and return the median wall-clock time of each run,
+    the median time -X importtime attributes to the module, and the slowest of the imports it caused."""
+    wall_times = []
+    import_times = []
+    imports = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                                 cwd=REPO_DIR, capture_output=True, text=True)
+        wall_times.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            return {'module': module, 'error': (process.stderr.strip().splitlines() or ['failed'])[-1]}
+        imports = _imports_of(parse_importtime(process.stderr), module)
+        import_times.append(imports[-1][3])
+
+    # The imports made by the module itself or by the modules it imports directly, slowest first.
+    slowest = sorted((entry for entry in imports[:-1] if entry[1] <= 2), key=lambda entry: -entry[3])[:top]
+    return {'module': module,
+            'wall_seconds': statistics.median(wall_times),
+            'import_seconds': statistics.median(import_times) / 1e6,
+            'slowest': [[name, cumulative / 1e6] for name, _, _, cumulative in slowest]}
+
+
+def _imports_of(imports: list[tuple[str, int, int, int]], module: str) -> list[tuple[str, int, int, int]]:
+    """Return the entries of the given imports that importing the given top-level module caused, ending with the
+    module's own entry. -X importtime reports each module after everything it imported.
+
+    >>> _imports_of([('site', 0, 9, 9), ('re', 1, 3, 3), ('analysis', 0, 5, 8)], 'analysis')
+    [('re', 1, 3, 3), ('analysis', 0, 5, 8)]
+    """
+    end = next(i for i, entry in enumerate(imports) if entry[0] == module and entry[1] == 0)
+    start = end
+    while start > 0 and imports[start - 1][1] > 0:
+        start -= 1
+    return imports[start:end + 1]
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Return a message for every result whose import time exceeds its baseline by more than the threshold.
+
+    >>> compare([{'module': 'analysis', 'import_seconds': 0.2}], {'analysis': {'import_seconds': 0.1}})
+    ['analysis: 0.200s, baseline 0.100s (+100%)']
+    """
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['module'])
+        if 'error' in result or previous is None or 'import_seconds' not in previous:
+            continue
+        if result['import_seconds'] > previous['import_seconds'] * (1 + threshold):
+            change = result['import_seconds'] / previous['import_seconds'] - 1
+            regressions.append(f"{result['module']}: {result['import_seconds']:.3f}s, "
+                               f"baseline {previous['import_seconds']:.3f}s (+{change:.0%})")
+    return regressions
+
+
+def report(results: list[dict[str, Any]], baseline: Optional[dict[str, dict[str, Any]]] = None) -> str:
+    """Return a readable table of the given results, with their baselines if given."""
+    lines = []
+    for result in results:
+        if 'error' in result:
+            lines.append(f"{result['module']:<12} failed: {result['error']}")
+            continue
+        line = f"{result['module']:<12} import {result['import_seconds']:.3f}s  wall {result['wall_seconds']:.3f}s"
+        if baseline and result['module'] in baseline:
+            line += f"  (baseline import {baseline[result['module']]['import_seconds']:.3f}s)"
+        lines.append(line)
+        for name, seconds in result['slowest']:
+            lines.append(f'    {seconds:.3f}s  {name}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure the cold-start import time of the entry points.')
+    parser.add_argument('modules', nargs='*', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='fail if an entry point regressed')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    measured = [measure(name, args.repeat) for name in args.modules]
+    recorded = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            recorded = json.load(file)
+
+    print(json.dumps(measured, indent=2) if args.json else report(measured, recorded))
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            json.dump({result['module']: result for result in measured if 'error' not in result}, file, indent=2)
+    if args.check:
+        if recorded is None:
+            sys.exit('No baseline recorded in ' + args.baseline + '; run with --save first.')
+        problems = compare(measured, recorded, args.threshold)
+        if problems:
+            sys.exit('Startup regressions:\n' + '\n'.join(problems))
@@ -0,0 +1,168 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file installs and checks the data the scorer needs besides its own files: the NLTK corpora and models, and the
+spaCy pipeline. Run it once when setting up a machine (it needs network access):
+
+    python bootstrap.py                 # install whatever is missing into data/resources
+    python bootstrap.py --check         # only report what is missing
+
+At runtime nothing is downloaded. The server calls preflight at startup, so a missing resource stops it from
+starting instead of failing a request, and the scoring code calls require before first using a resource, which
+checks it once per process.
+
+The directory resources are installed into is data/resources, or the COMPEL_RESOURCE_DIR environment variable.
+NLTK also finds resources in its usual locations (such as ~/nltk_data), and spaCy pipelines installed as packages
+are used when there is no copy in the resource directory.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import importlib
+import os
+import threading
+from typing import Iterable
+
+RESOURCE_DIR = os.environ.get('COMPEL_RESOURCE_DIR', os.path.join('data', 'resources'))
+
+# The NLTK resources used anywhere in the project, mapped to the path nltk.data.find looks them up by.
+NLTK_RESOURCES = {
+    'opinion_lexicon': 'corpora/opinion_lexicon',
+    'averaged_perceptron_tagger': 'taggers/averaged_perceptron_tagger',
+    'wordnet': 'corpora/wordnet',
+    'punkt': 'tokenizers/punkt',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+# The NLTK resources read while scoring a text, which a server must have before it starts.
+SCORING_NLTK_RESOURCES = ('opinion_lexicon',)
+
+SPACY_MODELS = ('en_core_web_sm',)
+
+
+class MissingResourceError(RuntimeError):
+    """Raised when a resource the scorer needs has not been installed."""
+
+    def __init__(self, missing: Iterable[str]) -> None:
+        self.missing = list(missing)
+        super().__init__('Missing resources: ' + ', '.join(self.missing) + '. Install them with '
+                         '"python bootstrap.py" (into ' + RESOURCE_DIR + ' or COMPEL_RESOURCE_DIR).')
+
+
+_available = set()
+_configured = False
+_resource_dir = RESOURCE_DIR
+_lock = threading.Lock()
+
+
+def configure(resource_dir: str = RESOURCE_DIR) -> None:
+    """Make NLTK look for its resources in the given directory before its usual locations."""
+    global _configured, _resource_dir
+    import nltk
+
+    with _lock:
+        if os.path.abspath(resource_dir) not in nltk.data.path:
+            nltk.data.path.insert(0, os.path.abspath(resource_dir))
+        _resource_dir = resource_dir
+        _configured = True
+
+
+def spacy_model_path(name: str) -> str:
+    """Return what to pass to spacy.load for the pipeline with the given name: its copy in the resource directory
+    if there is one, or else the name itself (i.e. the installed package)."""
+    path = os.path.join(_resource_dir, 'spacy', name)
+    return path if os.path.isdir(path) else name
+
+
+def has_nltk_resource(name: str) -> bool:
+    """Return whether the NLTK resource with the given name is installed."""
+    import nltk
+
+    if not _configured:
+        configure()
+    try:
+        nltk.data.find(NLTK_RESOURCES[name])
+    except LookupError:
+        return False
+    return True
+
+
+def has_spacy_model(name: str) -> bool:
+    """Return whether the spaCy pipeline with the given name is installed."""
+    import spacy.util
+
+    return spacy_model_path(name) != name or spacy.util.is_package(name)
+
+
+def missing_resources(nltk_resources: Iterable[str] = tuple(NLTK_RESOURCES),
+                      spacy_models: Iterable[str] = SPACY_MODELS) -> list[str]:
+    """Return the names of those of the given resources that are not installed."""
+    missing = [name for name in nltk_resources if not has_nltk_resource(name)]
+    missing.extend(name for name in spacy_models if not has_spacy_model(name))
+    return missing
+
+
+def preflight(nltk_resources: Iterable[str] = tuple(NLTK_RESOURCES),
+              spacy_models: Iterable[str] = SPACY_MODELS) -> None:
+    """Check that all the given resources are installed, and raise MissingResourceError naming every one that is
+    not. Call this at startup."""
+    nltk_resources = [name for name in nltk_resources if name not in _available]
+    missing = missing_resources(nltk_resources, spacy_models)
+    if missing:
+        raise MissingResourceError(missing)
+    _available.update(nltk_resources)
+
+
+def require(*names: str) -> None:
+    """Raise MissingResourceError if any of the NLTK resources with the given names is not installed.
+
+    Each resource is only looked for the first time it is required (or by preflight), so this is cheap enough to
+    call before every use.
+    """
+    for name in names:
+        if name not in _available:
+            if not has_nltk_resource(name):
+                raise MissingResourceError([name])
+            _available.add(name)
+
+
+def install(resource_dir: str = RESOURCE_DIR) -> list[str]:
+    """Download every missing resource into the given directory and return the names of those installed."""
+    import nltk
+    import spacy
+    import spacy.cli
+
+    os.makedirs(resource_dir, exist_ok=True)
+    configure(resource_dir)
+    installed = []
+    for name in NLTK_RESOURCES:
+        if not has_nltk_resource(name):
+            if not nltk.download(name, download_dir=resource_dir, raise_on_error=True):
+                raise MissingResourceError([name])
+            installed.append(name)
+    for name in SPACY_MODELS:
+        if not has_spacy_model(name):
+            spacy.cli.download(name)
+            importlib.invalidate_caches()
+            # Keep a copy in the resource directory so the pipeline is found even where the package is not.
+            spacy.load(name).to_disk(os.path.join(resource_dir, 'spacy', name))
+            installed.append(name)
+    return installed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Install or check the NLTK and spaCy resources the scorer needs.')
+    parser.add_argument('--check', action='store_true', help='only report missing resources; install nothing')
+    parser.add_argument('--resource-dir', default=RESOURCE_DIR)
+    args = parser.parse_args()
+
+    configure(args.resource_dir)
+    if args.check:
+        print('\n'.join(missing_resources()) or 'All resources are installed.')
+    else:
+        print('Installed: ' + (', '.join(install(args.resource_dir)) or 'nothing'))
@@ -0,0 +1,306 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains a command-line scorer for large batches of posts, such as a nightly backfill. It reads texts
+from a CSV or JSONL file as a stream, scores them on a pool of worker processes, and writes one row per text, in
+input order, to a CSV, JSONL or Parquet file:
+
+    python bulk_score.py posts.csv scores.csv                 # score the "text" column of posts.csv
+    python bulk_score.py posts.jsonl scores.parquet --ai --no-learn --workers 8
+    cat posts.jsonl | python bulk_score.py - - --input-format jsonl --output-format jsonl
+
+A JSONL line is a string or an object {"text": ..., "id": ...}; a CSV file has a header, and its text and id
+columns can be chosen with --text-column and --id-column. Each output row has the text's index in the input, its
+id, its compellingness, pathos and logos scores, whether its sentiment is negative and whether it gets an ethics
+warning. A text that cannot be read or scored gets a row with an error instead, and the other texts are still
+scored.
+
+With --ai, texts are scored with the AI lexicon, and, as on the website, what they teach it is recorded in the
+shared lexicon (so with several workers, what each text is scored against depends on timing). With --ai --no-learn,
+every worker scores against a frozen copy of the lexicon as it was when the run started, so nothing is recorded
+and the results depend only on the input. Parquet output needs the pyarrow package.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import collections
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, TextIO
+
+import ai_lexicon
+import analysis
+import bootstrap
+import document
+import nlp_models
+
+# The columns of every output row, in order.
+FIELDS = ('index', 'id', 'compellingness', 'pathos', 'logos', 'negative_sentiment', 'ethics_warning', 'error')
+
+# The number of texts each worker scores at a time (parsing them in one batch), and the default number of texts
+# between progress reports.
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_PROGRESS_EVERY = 10000
+
+# The formats a file's extension stands for.
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+
+def guess_format(path: str) -> str:
+    """Return the format the name of the given file stands for.
+
+    >>> guess_format('posts.ndjson'), guess_format('scores.parquet')
+    ('jsonl', 'parquet')
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Cannot tell the format of {path}; give it with --input-format or --output-format.')
+    return FORMATS[extension]
+
+
+def read_csv_rows(file: TextIO, text_column: str = 'text', id_column: str = 'id') -> Iterator[tuple[Any, Any]]:
+    """Yield the (text, id) of every row of the given CSV file, read lazily. The id is None if there is no id
+    column, and the text is None if the row has no text.
+
+    >>> import io
+    >>> list(read_csv_rows(io.StringIO('id,text\\n7,I am happy\\n')))
+    [('I am happy', '7')]
+    """
+    for row in csv.DictReader(file):
+        yield row.get(text_column), row.get(id_column)
+
+
+def read_jsonl_rows(file: TextIO) -> Iterator[tuple[Any, Any]]:
+    """Yield the (text, id) of every non-blank line of the given JSONL file, read lazily. A line that is not a
+    string or an object with a "text" yields the text None.
+
+    >>> import io
+    >>> list(read_jsonl_rows(io.StringIO('"I am happy"\\n\\n{"text": "I am sad", "id": 3}\\n[1]\\n')))
+    [('I am happy', None), ('I am sad', 3), (None, None)]
+    """
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield None, None
+            continue
+        if isinstance(row, dict):
+            yield row.get('text'), row.get('id')
+        else:
+            yield (row if isinstance(row, str) else None), None
+
+
+# What the worker processes score with, set once in each of them by _start_worker.
+_ai = False
+
+
+def _start_worker(ai: bool, frozen_entries: Optional[Mapping[str, tuple[float, float]]]) -> None:
+    """Set up a worker process to score with the AI lexicon if ai is True, and against a frozen copy of the given
+    lexicon entries, if given, instead of the shared lexicon."""
+    global _ai
+    _ai = ai
+    if frozen_entries is not None:
+        ai_lexicon.set_ai_lexicon(ai_lexicon.MemoryAILexicon(frozen_entries, frozen=True))
+
+
+def score_batch(rows: list[tuple[int, Any, Any]]) -> list[dict[str, Any]]:
+    """Return the output row of each of the given (index, text, id) rows, parsing their texts in one batch.
+
+    A text that cannot be split, parsed or scored gets an error row. If parsing the batch fails, the texts not yet
+    scored are parsed again one at a time, so that only the text the parser could not handle gets an error row.
+    """
+    results = {index: _error_row(index, row_id, 'the text must be a string')
+               for index, text, row_id in rows if not isinstance(text, str)}
+    valid = [(index, text, row_id) for index, text, row_id in rows if isinstance(text, str)]
+    try:
+        parsed_texts = analysis.iter_parsed(text for _, text, _ in valid)
+        for (index, _, row_id), parsed in zip(valid, parsed_texts):
+            results[index] = _score_parsed(index, row_id, parsed)
+    except Exception:  # Some text in the batch broke the parser; find out which one.
+        for index, text, row_id in valid:
+            if index not in results:
+                results[index] = _score_text(index, text, row_id)
+    return [results[index] for index, _, _ in rows]
+
+
+def _score_text(index: int, text: str, row_id: Any) -> dict[str, Any]:
+    """Return the output row of the given text, parsing it on its own."""
+    try:
+        parsed = next(analysis.iter_parsed([text]))
+    except Exception as error:  # One bad text must not stop the others from being scored.
+        return _error_row(index, row_id, f'{type(error).__name__}: {error}')
+    return _score_parsed(index, row_id, parsed)
+
+
+def _score_parsed(index: int, row_id: Any, parsed: document.Document) -> dict[str, Any]:
+    """Return the output row of the given parsed text."""
+    try:
+        scores = analysis.get_compellingness_ai(parsed) if _ai else analysis.get_compellingness(parsed)
+        warning = analysis.has_ethics_warning(parsed)
+    except Exception as error:  # One bad text must not stop the others from being scored.
+        return _error_row(index, row_id, f'{type(error).__name__}: {error}')
+    return dict(zip(FIELDS, (index, row_id, *scores, warning, None)))
+
+
+def _error_row(index: int, row_id: Any, message: str) -> dict[str, Any]:
+    """Return the output row reporting that the text at the given index could not be scored."""
+    return dict(zip(FIELDS, (index, row_id, None, None, None, None, None, message)))
+
+
+def score_rows(rows: Iterable[tuple[Any, Any]], ai: bool = False, learn: bool = True, workers: Optional[int] = None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[dict[str, Any]]:
+    """Yield the output row of each of the given (text, id) rows, in order, scoring them on the given number of
+    worker processes (by default, one per core).
+
+    At most two batches per worker are in flight at a time, so the rows are read as they are needed.
+    """
+    workers = workers or os.cpu_count() or 1
+    frozen_entries = ai_lexicon.get_ai_lexicon().entries() if ai and not learn else None
+    numbered = ((index, text, row_id) for index, (text, row_id) in enumerate(rows))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker,
+                             initargs=(ai, frozen_entries)) as executor:
+        in_flight: collections.deque[Future] = collections.deque()
+        batch = list(itertools.islice(numbered, batch_size))
+        while batch:
+            in_flight.append(executor.submit(score_batch, batch))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+            batch = list(itertools.islice(numbered, batch_size))
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def with_progress(rows: Iterable[dict[str, Any]], every: int = DEFAULT_PROGRESS_EVERY,
+                  report: Optional[Callable[[int, int, float], None]] = None) -> Iterator[dict[str, Any]]:
+    """Yield the given output rows, calling report with the number of rows so far, how many of them are errors and
+    the seconds spent, after every every rows and at the end. By default, the progress is printed to stderr. If
+    every is 0, progress is not reported at all.
+    """
+    if every <= 0:
+        yield from rows
+        return
+    report = report or report_progress
+    start = time.monotonic()
+    count = errors = 0
+    for row in rows:
+        count += 1
+        errors += row['error'] is not None
+        yield row
+        if count % every == 0:
+            report(count, errors, time.monotonic() - start)
+    report(count, errors, time.monotonic() - start)
+
+
+def report_progress(count: int, errors: int, seconds: float) -> None:
+    """Print how many texts have been scored and how fast."""
+    rate = count / seconds if seconds > 0 else 0.0
+    print(f'{count} texts, {errors} errors, {rate:.1f} texts/s', file=sys.stderr, flush=True)
+
+
+def write_csv(rows: Iterable[dict[str, Any]], file: TextIO) -> None:
+    """Write the given output rows to the given file as CSV, with a header."""
+    writer = csv.DictWriter(file, FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def write_jsonl(rows: Iterable[dict[str, Any]], file: TextIO) -> None:
+    """Write the given output rows to the given file as JSON lines."""
+    for row in rows:
+        file.write(json.dumps(row) + '\n')
+
+
+def write_parquet(rows: Iterable[dict[str, Any]], path: str, row_group_size: int = 10000) -> None:
+    """Write the given output rows to a Parquet file at the given path, row_group_size rows at a time.
+
+    Ids are written as strings. This needs the pyarrow package.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Writing Parquet needs the pyarrow package: pip install pyarrow') from None
+
+    schema = pyarrow.schema([('index', pyarrow.int64()), ('id', pyarrow.string()),
+                             ('compellingness', pyarrow.float64()), ('pathos', pyarrow.float64()),
+                             ('logos', pyarrow.float64()), ('negative_sentiment', pyarrow.bool_()),
+                             ('ethics_warning', pyarrow.bool_()), ('error', pyarrow.string())])
+    rows = iter(rows)
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        group = list(itertools.islice(rows, row_group_size))
+        while group:
+            columns = {field: [row[field] for row in group] for field in FIELDS}
+            columns['id'] = [None if value is None else str(value) for value in columns['id']]
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            group = list(itertools.islice(rows, row_group_size))
+
+
+def read_rows(file: TextIO, input_format: str, text_column: str = 'text',
+              id_column: str = 'id') -> Iterator[tuple[Any, Any]]:
+    """Yield the (text, id) rows of the given file in the given format ('csv' or 'jsonl')."""
+    if input_format == 'csv':
+        return read_csv_rows(file, text_column, id_column)
+    if input_format == 'jsonl':
+        return read_jsonl_rows(file)
+    raise ValueError(f'Cannot read {input_format} input; use csv or jsonl.')
+
+
+def write_rows(rows: Iterable[dict[str, Any]], path: str, output_format: str) -> None:
+    """Write the given output rows to the file at the given path ('-' for standard output) in the given format."""
+    if output_format == 'parquet':
+        if path == '-':
+            raise ValueError('Parquet output must go to a file.')
+        write_parquet(rows, path)
+    elif output_format in ('csv', 'jsonl'):
+        write = write_csv if output_format == 'csv' else write_jsonl
+        if path == '-':
+            write(rows, sys.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                write(rows, file)
+    else:
+        raise ValueError(f'Cannot write {output_format} output; use csv, jsonl or parquet.')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Score a CSV or JSONL file of texts.')
+    parser.add_argument('input', help="CSV or JSONL file of texts ('-' for standard input)")
+    parser.add_argument('output', help="CSV, JSONL or Parquet file to write ('-' for standard output)")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=('csv', 'jsonl', 'parquet'))
+    parser.add_argument('--text-column', default='text')
+    parser.add_argument('--id-column', default='id')
+    parser.add_argument('--ai', action='store_true', help='score with the AI lexicon')
+    parser.add_argument('--no-learn', action='store_true', help='with --ai, do not record anything in the lexicon')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--progress-every', type=int, default=DEFAULT_PROGRESS_EVERY,
+                        help='texts between progress reports on stderr (0 for none)')
+    args = parser.parse_args()
+    if args.progress_every < 0:
+        parser.error('--progress-every must be 0 or more')
+    if args.batch_size < 1 or (args.workers is not None and args.workers < 1):
+        parser.error('--batch-size and --workers must be at least 1')
+
+    try:
+        bootstrap.preflight(bootstrap.SCORING_NLTK_RESOURCES, [nlp_models.DEFAULT_MODEL])
+        in_format = args.input_format or guess_format(args.input)
+        out_format = args.output_format or guess_format(args.output)
+        with (sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')) as source:
+            scored = score_rows(read_rows(source, in_format, args.text_column, args.id_column), args.ai,
+                                not args.no_learn, args.workers, args.batch_size)
+            write_rows(with_progress(scored, args.progress_every), args.output, out_format)
+    except (RuntimeError, ValueError) as error:  # Including bootstrap.MissingResourceError.
+        sys.exit(str(error))
@@ -0,0 +1,86 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the Document class, which holds everything we learn from splitting and parsing a text, so that
+pathos, logos and ethics scoring and the AI lexicon's learning can all share one analysis of the text instead of
+each splitting, tokenising and tagging it again.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+from functools import cached_property
+from typing import Any, Optional, Union
+
+import metrics
+import parse_tree
+import process
+
+
+class Document:
+    """A text together with its sentences and its spaCy parse.
+
+    Every part of the analysis is computed the first time it is needed and then kept, so the text is split,
+    tokenised and parsed at most once however many scorers read it.
+
+    Instance Attributes:
+        - text: The original text.
+    """
+    text: str
+
+    def __init__(self, text: str, docs: Optional[list[Any]] = None) -> None:
+        """Initialize a document for the given text.
+
+        If docs is given, it must be the spaCy Docs of self.processed_sentences (e.g. from a batch parse), and the
+        text is not parsed again.
+        """
+        self.text = text
+        if docs is not None:
+            self.docs = docs
+
+    @cached_property
+    def sentences(self) -> list[str]:
+        """The sentences of the text as they were written, as returned by process.text_to_sentences."""
+        with metrics.stage('split'):
+            return process.text_to_sentences(self.text)
+
+    @cached_property
+    def processed_sentences(self) -> list[str]:
+        """The lowercase single-line sentences that get parsed, as returned by process.process_text.
+
+        They are made from sentences, so the text is only split once.
+        """
+        return [process.handle_multiline(sentence).lower() for sentence in self.sentences]
+
+    @cached_property
+    def docs(self) -> list[Any]:
+        """The spaCy Doc of each processed sentence."""
+        sentences = self.processed_sentences
+        with metrics.stage('parse'):
+            return list(parse_tree.parse_sentences(sentences))
+
+    @cached_property
+    def tokens(self) -> list[Any]:
+        """The spaCy tokens of every processed sentence, in order, with their POS tags and dependency labels."""
+        return [token for doc in self.docs for token in doc]
+
+    def trees(self) -> list[parse_tree.ParseTree]:
+        """Return new parse trees for the sentences of the text.
+
+        The trees are built from the stored parse each time, since scoring them changes their sentiments.
+        """
+        docs = self.docs
+        trees = []
+        with metrics.stage('trees'):
+            for doc in docs:
+                trees.extend(parse_tree.trees_from_doc(doc))
+        return trees
+
+
+def as_document(text: Union[str, Document]) -> Document:
+    """Return the given document, or a new document for the given text."""
+    if isinstance(text, Document):
+        return text
+    return Document(text)
@@ -0,0 +1,244 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains FlatParseTree, a compact alternative to ParseTree for working with large corpora.
+
+Instead of one Python object per word, a FlatParseTree stores its nodes in parallel NumPy arrays: the index of each
+node's parent, ids for its word, head word, dependency, POS and fine-grained tag, and a float column with its
+sentiment. Strings are replaced by ids from a StringTable, so each distinct string is stored once however many
+trees use it. The nodes are kept in the same (pre)order a ParseTree visits them in, so queries return their results
+in the same order as the ParseTree methods they mirror, and trees convert losslessly in both directions.
+
+A StringTable never forgets a string, so STRINGS, the table used by default, grows with the vocabulary of every tree
+the process has flattened. When working through a large corpus, give each batch of trees its own table (the strings
+argument); it is freed along with them.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+import parse_tree
+
+
+class StringTable:
+    """A table assigning a distinct integer id to every string it has seen.
+
+    >>> table = StringTable()
+    >>> table.id_of('happy'), table.id_of('sad'), table.id_of('happy')
+    (0, 1, 0)
+    >>> table.lookup('sad'), table.lookup('table')
+    (1, -1)
+    >>> table.string(1)
+    'sad'
+    """
+    # Private Instance Attributes:
+    # - _ids: Maps each string to its id.
+    # - _strings: The strings, indexed by their ids.
+    # - _lock: Guards the assignment of new ids.
+
+    _ids: dict[str, int]
+    _strings: list[str]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._ids = {}
+        self._strings = []
+        self._lock = threading.Lock()
+
+    def id_of(self, string: str) -> int:
+        """Return the id of the given string, assigning it a new one if it has none yet."""
+        string_id = self._ids.get(string)
+        if string_id is None:
+            with self._lock:
+                string_id = self._ids.get(string)
+                if string_id is None:
+                    string_id = len(self._strings)
+                    self._strings.append(string)
+                    self._ids[string] = string_id
+        return string_id
+
+    def lookup(self, string: str) -> int:
+        """Return the id of the given string, or -1 if it has none (so no tree can contain it)."""
+        return self._ids.get(string, -1)
+
+    def string(self, string_id: int) -> str:
+        """Return the string with the given id."""
+        return self._strings[string_id]
+
+
+# The table used by flat trees that are not given their own. It lasts as long as the process.
+STRINGS = StringTable()
+
+
+class FlatParseTree:
+    """A parse tree stored as parallel arrays with one entry per node, in preorder.
+
+    Node 0 is the root. Node i stands for the ParseTree node whose root tuple is
+    (word, dependency, head word, POS) = (strings.string(words[i]), strings.string(deps[i]),
+    strings.string(heads[i]), strings.string(pos[i])).
+
+    Instance Attributes:
+        - parents: The index of each node's parent, or -1 for the root.
+        - words: The id of each node's word.
+        - deps: The id of each node's dependency label.
+        - heads: The id of each node's head word.
+        - pos: The id of each node's POS tag.
+        - sentiment: The sentiment (pathos) score of each node.
+        - tags: The id of each node's fine-grained (Penn Treebank) tag, or of '' if it is not known.
+        - strings: The table the ids are from.
+
+    Representation Invariants:
+        - len(self.parents) == len(self.words) == len(self.deps) == len(self.heads) == len(self.pos) \
+          == len(self.sentiment) == len(self.tags)
+        - len(self.parents) == 0 or self.parents[0] == -1
+        - all(self.parents[i] < i for i in range(1, len(self.parents)))
+    """
+    parents: np.ndarray
+    words: np.ndarray
+    deps: np.ndarray
+    heads: np.ndarray
+    pos: np.ndarray
+    sentiment: np.ndarray
+    tags: np.ndarray
+    strings: StringTable
+
+    def __init__(self, parents: Any, words: Any, deps: Any, heads: Any, pos: Any,
+                 sentiment: Optional[Any] = None, tags: Optional[Any] = None,
+                 strings: Optional[StringTable] = None) -> None:
+        """Initialize a flat tree from its columns, whose ids are from the given table (STRINGS by default). The
+        sentiment column defaults to all zeros, and the tags column to all unknown."""
+        self.strings = strings if strings is not None else STRINGS
+        self.parents = np.asarray(parents, dtype=np.int32)
+        self.words = np.asarray(words, dtype=np.int32)
+        self.deps = np.asarray(deps, dtype=np.int32)
+        self.heads = np.asarray(heads, dtype=np.int32)
+        self.pos = np.asarray(pos, dtype=np.int32)
+        if sentiment is None:
+            self.sentiment = np.zeros(len(self.parents), dtype=np.float64)
+        else:
+            self.sentiment = np.asarray(sentiment, dtype=np.float64)
+        if tags is None:
+            self.tags = np.full(len(self.parents), self.strings.id_of(''), dtype=np.int32)
+        else:
+            self.tags = np.asarray(tags, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    @classmethod
+    def from_parse_tree(cls, tree: parse_tree.ParseTree, strings: Optional[StringTable] = None) -> FlatParseTree:
+        """Return a flat copy of the given (non-empty) parse tree, including its sentiments, with ids from the given
+        table (STRINGS by default).
+
+        >>> tree = parse_tree.ParseTree(('good', 'ROOT', 'good', 'ADJ'),
+        ...                             [parse_tree.ParseTree(('very', 'advmod', 'good', 'ADV'), [])], 1)
+        >>> flat = FlatParseTree.from_parse_tree(tree)
+        >>> flat.parents.tolist(), flat.sentiment.tolist()
+        ([-1, 0], [1.0, 0.0])
+        """
+        strings = strings if strings is not None else STRINGS
+        columns = ([], [], [], [], [], [], [])
+        stack = [(tree, -1)]
+        while stack:
+            node, parent = stack.pop()
+            index = len(columns[0])
+            _append_node(strings, columns, parent, node._root, node.sentiment, node.tag)
+            # Push the subtrees in reverse so that they are popped (and numbered) from left to right.
+            stack.extend((subtree, index) for subtree in reversed(node._subtrees))
+        return cls(*columns, strings=strings)
+
+    @classmethod
+    def from_doc(cls, doc: Any, strings: Optional[StringTable] = None) -> list[FlatParseTree]:
+        """Return the flat trees of a sentence parsed by spaCy, one per ROOT, like parse_tree.trees_from_doc, with
+        ids from the given table (STRINGS by default)."""
+        strings = strings if strings is not None else STRINGS
+        children = [[] for _ in doc]
+        roots = []
+        for token in doc:
+            if token.head.i == token.i:
+                roots.append(token)
+            else:
+                children[token.head.i].append(token)
+
+        trees = []
+        for root in roots:
+            columns = ([], [], [], [], [], [], [])
+            stack = [(root, -1)]
+            while stack:
+                token, parent = stack.pop()
+                index = len(columns[0])
+                _append_node(strings, columns, parent, (token.text, token.dep_, token.head.text, token.pos_), 0,
+                             token.tag_)
+                stack.extend((child, index) for child in reversed(children[token.i]))
+            trees.append(cls(*columns, strings=strings))
+        return trees
+
+    def to_parse_tree(self) -> parse_tree.ParseTree:
+        """Return this tree as a ParseTree, including its sentiments and tags."""
+        nodes = []
+        for i in range(len(self)):
+            sentiment = self.sentiment[i].item()
+            node = parse_tree.ParseTree(self.node(i), [], int(sentiment) if sentiment.is_integer() else sentiment,
+                                        tag=self.strings.string(self.tags[i]) or None)
+            nodes.append(node)
+            if self.parents[i] >= 0:
+                nodes[self.parents[i]].add_subtree(node)
+        nodes[0].build_index()
+        return nodes[0]
+
+    def node(self, i: int) -> tuple[str, str, str, str]:
+        """Return the (word, dependency, head word, POS) tuple of node i."""
+        return (self.strings.string(self.words[i]), self.strings.string(self.deps[i]),
+                self.strings.string(self.heads[i]), self.strings.string(self.pos[i]))
+
+    def contains(self, pos: str) -> bool:
+        """Return whether any node of this tree has the given POS."""
+        return bool(np.any(self.pos == self.strings.lookup(pos)))
+
+    def pos_instances(self, pos: str) -> list[tuple[str, str, str, str]]:
+        """Return the tuples of all nodes with the given POS, in the order ParseTree.pos_instances returns them."""
+        return [self.node(i) for i in np.flatnonzero(self.pos == self.strings.lookup(pos))]
+
+    def dep_instances(self, tag: str) -> list[tuple[str, str, str, str]]:
+        """Return the tuples of all nodes with the given dependency, in the order ParseTree.dep_instances returns
+        them."""
+        return [self.node(i) for i in np.flatnonzero(self.deps == self.strings.lookup(tag))]
+
+    def get_pathos_sum(self) -> tuple[float, bool]:
+        """Return the sum of the absolute sentiments of the nodes and whether any node has a negative sentiment."""
+        return float(np.abs(self.sentiment).sum()), bool(np.any(self.sentiment < 0))
+
+    def count_sentiment_bearers(self) -> int:
+        """Return the number of nodes whose sentiment is not 0."""
+        return int(np.count_nonzero(self.sentiment))
+
+    def get_pathos(self) -> tuple[float, bool]:
+        """Return the overall pathos of the tree and whether a negative sentiment bearing node is present.
+
+        >>> flat = FlatParseTree([-1, 0, 0], [0, 1, 2], [0, 0, 0], [0, 0, 0], [0, 0, 0], [2, -1, 0])
+        >>> flat.get_pathos()
+        (1.5, True)
+        """
+        pathos_sum = self.get_pathos_sum()
+        return pathos_sum[0] / max(self.count_sentiment_bearers(), 1), pathos_sum[1]
+
+
+def _append_node(strings: StringTable, columns: tuple[list, ...], parent: int, root: tuple[str, str, str, str],
+                 sentiment: float, tag: Optional[str]) -> None:
+    """Append a node with the given parent index, root tuple, sentiment and tag to the given columns, with ids from
+    the given table."""
+    parents, words, deps, heads, pos, sentiments, tags = columns
+    parents.append(parent)
+    words.append(strings.id_of(root[0]))
+    deps.append(strings.id_of(root[1]))
+    heads.append(strings.id_of(root[2]))
+    pos.append(strings.id_of(root[3]))
+    sentiments.append(sentiment)
+    tags.append(strings.id_of(tag or ''))
@@ -0,0 +1,276 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the code that collects tweets to score. A tweet source gives the texts of a user's tweets one at
+a time: SnscrapeSource runs the snscrape command and reads its JSONL output through a pipe as it is written, and
+JSONLSource reads the same rows from local files, so it can stand in for the scraper when there is no network
+(e.g. in tests). fetch_tweets reads several users' tweets at once, with at most a fixed number of sources running
+at a time, and score_tweets hands the texts to the scorer as they arrive, so memory does not grow with the number
+of tweets.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import collections
+import contextlib
+import itertools
+import json
+import queue
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, Optional
+
+import analysis
+import nlp_models
+
+# The default number of tweets read per user, the default number of users whose tweets are read at once, and the
+# default number of tweets read ahead of the consumer.
+DEFAULT_MAX_RESULTS = 100
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BUFFER_SIZE = 1000
+
+
+class IngestError(Exception):
+    """Raised when the tweets of a user cannot be read."""
+
+
+def parse_tweets(lines: Iterable[str]) -> Iterator[str]:
+    """Yield the text of the tweet on each of the given JSONL lines, with its line breaks removed. Blank lines and
+    rows without text are skipped.
+
+    >>> list(parse_tweets(['{"content": "Hi\\\\nthere"}\\n', '\\n', '{"rawContent": "Bye"}\\n', '{"id": 1}\\n']))
+    ['Hithere', 'Bye']
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        # Newer versions of snscrape call the text rawContent.
+        text = row.get('rawContent', row.get('content')) if isinstance(row, dict) else None
+        if isinstance(text, str):
+            yield text.replace('\n', '')
+
+
+class TweetSource:
+    """Where the tweets of a user come from.
+
+    This is an abstract class. tweets returns a generator, so that a reader that stops early can close it and let
+    the source release what it holds (such as a running scraper).
+    """
+
+    def tweets(self, username: str) -> Iterator[str]:
+        """Yield the texts of the given user's tweets, newest first."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Make every tweets generator of this source that is waiting for its next tweet stop waiting, so that the
+        threads reading them can finish. Does nothing unless reading can block."""
+
+
+class SnscrapeSource(TweetSource):
+    """Reads tweets by running snscrape, parsing each row of its output as soon as it is written.
+
+    Instance Attributes:
+        - max_results: The greatest number of tweets read per user.
+        - command: The snscrape executable.
+    """
+    # Private Instance Attributes:
+    # - _processes: The scrapers that are running.
+    # - _lock: Guards _processes.
+
+    max_results: int
+    command: str
+    _processes: set[subprocess.Popen]
+    _lock: threading.Lock
+
+    def __init__(self, max_results: int = DEFAULT_MAX_RESULTS, command: str = 'snscrape') -> None:
+        self.max_results = max_results
+        self.command = command
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def tweets(self, username: str) -> Iterator[str]:
+        """Yield the texts of the given user's tweets, newest first.
+
+        Raise IngestError if snscrape fails. The scraper is stopped if the generator is closed before it finishes.
+        """
+        arguments = [self.command, '--jsonl', '--max-results', str(self.max_results), 'twitter-search',
+                     f'from:{username}']
+        # The scraper's messages go to a file rather than a pipe, which would stop it once full while only its
+        # output is being read.
+        with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as errors:
+            try:
+                process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=errors, text=True,
+                                           encoding='utf-8')
+            except OSError as error:
+                raise IngestError(f'Cannot run {self.command}: {error}') from error
+            with self._lock:
+                self._processes.add(process)
+            read_all = False
+            try:
+                count = 0
+                for text in parse_tweets(process.stdout):
+                    yield text
+                    count += 1
+                    if count >= self.max_results:
+                        break
+                else:
+                    read_all = True
+            except ValueError as error:
+                raise IngestError(f'{self.command} wrote a row that is not JSON for {username}') from error
+            finally:
+                # Stop the scraper if it may still be writing: enough tweets were read, or the reader stopped early.
+                stopped = not read_all and process.poll() is None
+                if stopped:
+                    process.kill()
+                process.stdout.close()
+                returncode = process.wait()
+                with self._lock:
+                    self._processes.discard(process)
+            if returncode != 0 and not stopped:
+                errors.seek(0)
+                message = errors.read().strip().splitlines()
+                raise IngestError(f'{self.command} failed for {username}: ' + (message[-1] if message else
+                                                                                f'exit status {returncode}'))
+
+    def stop(self) -> None:
+        """Kill every scraper this source is running, so that the threads reading their output stop waiting."""
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+
+
+class JSONLSource(TweetSource):
+    """Reads tweets from local JSONL files in the format snscrape writes, one file per user.
+
+    Instance Attributes:
+        - path: The path of a user's file, with {username} where the username goes.
+        - max_results: The greatest number of tweets read per user, or None for all of them.
+    """
+    path: str
+    max_results: Optional[int]
+
+    def __init__(self, path: str, max_results: Optional[int] = None) -> None:
+        self.path = path
+        self.max_results = max_results
+
+    def tweets(self, username: str) -> Iterator[str]:
+        """Yield the texts of the tweets in the given user's file.
+
+        Raise IngestError if the file cannot be read or has a row that is not JSON.
+        """
+        try:
+            with open(self.path.format(username=username), encoding='utf-8') as file:
+                yield from itertools.islice(parse_tweets(file), self.max_results)
+        except (OSError, ValueError) as error:
+            raise IngestError(f'Cannot read the tweets of {username}: {error}') from error
+
+
+_DONE = object()
+
+
+def fetch_tweets(usernames: Iterable[str], source: TweetSource, concurrency: int = DEFAULT_CONCURRENCY,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[tuple[str, str]]:
+    """Yield the (username, text) of the tweets of every given user, as they are read from the given source.
+
+    The tweets of up to concurrency users are read at once, each user's in order, and at most buffer_size tweets
+    are read ahead of the caller. Raise IngestError as soon as any user's tweets cannot be read. Closing the
+    generator stops the source (see TweetSource.stop), so a source should not be shared with another call that is
+    still reading.
+    """
+    usernames = list(usernames)
+    tweets = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        """Queue the given item for the caller, and return False instead if the caller has stopped reading."""
+        while not stop.is_set():
+            try:
+                tweets.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(username: str) -> None:
+        if stop.is_set():
+            return
+        try:
+            with contextlib.closing(source.tweets(username)) as texts:
+                for text in texts:
+                    if not put((username, text, None)):
+                        break
+        except Exception as error:  # Reported to the caller, in its own thread.
+            put((username, None, error))
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix='ingest')
+    try:
+        for username in usernames:
+            executor.submit(fetch, username)
+        remaining = len(usernames)
+        while remaining:
+            item = tweets.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            username, text, error = item
+            if error is not None:
+                if isinstance(error, IngestError):
+                    raise error
+                raise IngestError(f'Cannot read the tweets of {username}: {error}') from error
+            yield username, text
+    finally:
+        stop.set()
+        # A thread may be blocked reading a scraper's output, which only ends once the scraper is killed. Threads
+        # that are not waited for here finish on their own, since they give up as soon as they see stop.
+        source.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def score_tweets(usernames: Iterable[str], source: TweetSource, ai: bool = False,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 batch_size: int = nlp_models.DEFAULT_BATCH_SIZE) -> Iterator[tuple[str, str, tuple]]:
+    """Yield the username, text and compellingness scores (see analysis.get_compellingness, or
+    analysis.get_compellingness_ai if ai is True) of every tweet of the given users, scoring the tweets in batches
+    of batch_size as they are read."""
+    # The user of each tweet handed to the parser, in order.
+    tweet_users = collections.deque()
+
+    def texts() -> Iterator[str]:
+        for username, text in fetch_tweets(usernames, source, concurrency):
+            tweet_users.append(username)
+            yield text
+
+    for parsed in analysis.iter_parsed(texts(), batch_size=batch_size):
+        scores = analysis.get_compellingness_ai(parsed) if ai else analysis.get_compellingness(parsed)
+        yield tweet_users.popleft(), parsed.text, scores
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Score users' tweets as they are scraped.")
+    parser.add_argument('usernames', nargs='+')
+    parser.add_argument('--max-results', type=int, default=DEFAULT_MAX_RESULTS)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--fixture', help='read {username} from this JSONL file pattern instead of scraping')
+    parser.add_argument('--ai', action='store_true', help='score with the AI lexicon')
+    args = parser.parse_args()
+
+    tweet_source = JSONLSource(args.fixture, args.max_results) if args.fixture else SnscrapeSource(args.max_results)
+    try:
+        for user, tweet_text, tweet_scores in score_tweets(args.usernames, tweet_source, args.ai, args.concurrency):
+            print(json.dumps({'username': user, 'text': tweet_text, 'compellingness': tweet_scores[0],
+                              'pathos': tweet_scores[1], 'logos': tweet_scores[2],
+                              'negative_sentiment': tweet_scores[3]}))
+    except IngestError as ingest_error:
+        sys.exit(str(ingest_error))
@@ -0,0 +1,277 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains JobQueue, a local work queue for scoring texts in the background, so that a web request can
+hand a text over and return at once instead of holding its thread for the whole parse-and-learn pipeline.
+
+Jobs run on a fixed-size pool of worker threads, and no more than a fixed number of jobs may be waiting or running
+at a time. Each job's status and result is kept in a job store: MemoryJobStore keeps them in this process, while
+SQLiteJobStore keeps them in a database file, so that with several server processes on one machine any of them can
+report on a job that another one is running. Neither needs a separate message broker.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+JOBS_DB_FILE = 'data/jobs.sqlite3'
+
+# The states of a job. A job is finished once it is DONE or FAILED.
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# The default number of worker threads, the default number of jobs that may be queued or running at once, and the
+# default number of seconds a finished job is kept for.
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 100
+DEFAULT_KEEP_FOR = 3600.0
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted to a queue that already has as many pending jobs as it allows."""
+
+
+class JobStore:
+    """Where a JobQueue keeps the status and result of each of its jobs.
+
+    This is an abstract class. A job is represented by a dictionary with its 'id', 'status', 'result' (None
+    until it is done) and 'error' (None unless it failed).
+    """
+
+    def create(self, job_id: str) -> None:
+        """Record a new queued job with the given id."""
+        raise NotImplementedError
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Set the status of the job with the given id, and its result or error."""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Return the job with the given id, or None if there is no such job."""
+        raise NotImplementedError
+
+    def purge(self, finished_before: float) -> None:
+        """Forget every job that finished before the given time (as returned by time.time())."""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """A job store kept in the memory of this process.
+
+    >>> store = MemoryJobStore()
+    >>> store.create('a'); store.update('a', DONE, {'score': 1})
+    >>> store.get('a')
+    {'id': 'a', 'status': 'done', 'result': {'score': 1}, 'error': None}
+    """
+    # Private Instance Attributes:
+    # - _jobs: Maps each job id to the job and the time it finished at (or None).
+    # - _lock: Guards _jobs.
+
+    _jobs: dict[str, tuple[dict[str, Any], Optional[float]]]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str) -> None:
+        """Record a new queued job with the given id."""
+        with self._lock:
+            self._jobs[job_id] = ({'id': job_id, 'status': QUEUED, 'result': None, 'error': None}, None)
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Set the status of the job with the given id, and its result or error."""
+        finished = time.time() if status in (DONE, FAILED) else None
+        with self._lock:
+            self._jobs[job_id] = ({'id': job_id, 'status': status, 'result': result, 'error': error}, finished)
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Return the job with the given id, or None if there is no such job."""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        return None if entry is None else dict(entry[0])
+
+    def purge(self, finished_before: float) -> None:
+        """Forget every job that finished before the given time."""
+        with self._lock:
+            self._jobs = {job_id: entry for job_id, entry in self._jobs.items()
+                          if entry[1] is None or entry[1] >= finished_before}
+
+
+class SQLiteJobStore(JobStore):
+    """A job store kept in a SQLite database, shared by every process on the machine that uses the same file.
+
+    Results are stored as JSON, so they must be made of dictionaries, lists, strings, numbers, booleans and None
+    (tuples come back as lists).
+    """
+    # Private Instance Attributes:
+    # - _db_file: The path of the SQLite database.
+    # - _local: Holds one connection per thread, since SQLite connections cannot be shared between threads.
+
+    _db_file: str
+    _local: threading.local
+
+    def __init__(self, db_file: str = JOBS_DB_FILE) -> None:
+        """Initialize the store kept in the given database file, creating its table if needed."""
+        self._db_file = db_file
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+                               'result TEXT, error TEXT, finished REAL)')
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._db_file, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def create(self, job_id: str) -> None:
+        """Record a new queued job with the given id."""
+        with self._connection() as connection:
+            connection.execute('INSERT INTO jobs (id, status) VALUES (?, ?)', (job_id, QUEUED))
+
+    def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Set the status of the job with the given id, and its result or error."""
+        finished = time.time() if status in (DONE, FAILED) else None
+        with self._connection() as connection:
+            connection.execute('UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?',
+                               (status, json.dumps(result), error, finished, job_id))
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Return the job with the given id, or None if there is no such job."""
+        row = self._connection().execute('SELECT status, result, error FROM jobs WHERE id = ?',
+                                         (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {'id': job_id, 'status': row[0], 'result': None if row[1] is None else json.loads(row[1]),
+                'error': row[2]}
+
+    def purge(self, finished_before: float) -> None:
+        """Forget every job that finished before the given time."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM jobs WHERE finished < ?', (finished_before,))
+
+
+class JobQueue:
+    """A queue of jobs that each call one function on one argument, run by a fixed pool of worker threads.
+
+    Instance Attributes:
+        - store: Where the status and result of every job is kept.
+        - max_pending: The greatest number of jobs that may be queued or running at once.
+        - keep_for: The number of seconds a finished job is kept in the store for.
+
+    >>> queue = JobQueue(lambda text: text.upper(), workers=1)
+    >>> job_id = queue.submit('hello')
+    >>> queue.wait(job_id, timeout=5)['result']
+    'HELLO'
+    >>> queue.shutdown()
+    """
+    # Private Instance Attributes:
+    # - _function: The function each job calls.
+    # - _executor: The pool of worker threads.
+    # - _pending: The number of jobs that are queued or running.
+    # - _lock: Guards _pending.
+
+    store: JobStore
+    max_pending: int
+    keep_for: float
+    _function: Callable[[Any], Any]
+    _executor: ThreadPoolExecutor
+    _pending: int
+    _lock: threading.Lock
+
+    def __init__(self, function: Callable[[Any], Any], workers: int = DEFAULT_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING, store: Optional[JobStore] = None,
+                 keep_for: float = DEFAULT_KEEP_FOR) -> None:
+        self.store = store if store is not None else MemoryJobStore()
+        self.max_pending = max_pending
+        self.keep_for = keep_for
+        self._function = function
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, argument: Any) -> str:
+        """Queue a job calling the function on the given argument and return the job's id.
+
+        Raise QueueFullError if max_pending jobs are already queued or running.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f'{self._pending} jobs are already pending')
+            self._pending += 1
+
+        try:
+            self.store.purge(time.time() - self.keep_for)
+            job_id = uuid.uuid4().hex
+            self.store.create(job_id)
+            self._executor.submit(self._run, job_id, argument)
+        except BaseException:
+            # The job never reached a worker, so nothing else will give its place in the queue back.
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, argument: Any) -> None:
+        """Run the job with the given id and record its result, or its error if it raised one."""
+        try:
+            self.store.update(job_id, RUNNING)
+            result = self._function(argument)
+        except Exception as error:  # The error is recorded for whoever polls the job, and logged in full.
+            logging.getLogger(__name__).exception('Job %s failed', job_id)
+            self.store.update(job_id, FAILED, error=f'{type(error).__name__}: {error}')
+        else:
+            self.store.update(job_id, DONE, result)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        """Return the job with the given id, or None if there is no such job."""
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float, interval: float = 0.1) -> Optional[dict[str, Any]]:
+        """Return the job with the given id once it has finished, or as it is after timeout seconds if it has not.
+
+        The store is checked every interval seconds, so this also works for jobs run by other processes sharing
+        a SQLiteJobStore.
+        """
+        deadline = time.monotonic() + timeout
+        job = self.store.get(job_id)
+        while job is not None and job['status'] not in (DONE, FAILED) and time.monotonic() < deadline:
+            time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+            job = self.store.get(job_id)
+        return job
+
+    def pending(self) -> int:
+        """Return the number of jobs submitted to this queue that are queued or running."""
+        return self._pending
+
+    def shutdown(self) -> None:
+        """Wait for the queued jobs to finish and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+
+def store_from_environment() -> JobStore:
+    """Return the job store chosen by the JOB_STORE environment variable: "memory" (the default) or "sqlite", in
+    the database named by JOBS_DB (data/jobs.sqlite3 by default)."""
+    if os.environ.get('JOB_STORE', 'memory') == 'sqlite':
+        return SQLiteJobStore(os.environ.get('JOBS_DB', JOBS_DB_FILE))
+    return MemoryJobStore()
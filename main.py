@@ -10,9 +10,8 @@ Copyright
 ==========
 This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
 """
-import os
-import pandas as pd
 import analysis
+import ingest
 # our graphical user interface can be found under the python file gui.py and gui_ai.py
 
 
@@ -20,24 +19,17 @@ def tweet(usernames: list) -> dict[str: list[str]]:
     """ This function scrapes a user's Twitter tweets from the internet and returns a dictionary with the
     username and their tweets as key-value pairs.
 
+    The users' tweets are scraped at the same time (see ingest.fetch_tweets).
+
     Preconditions:
     - usernames != []
 
     """
-    total_tweets = {}
-
-    for username in usernames:
-        # For a given user, generate a JSON file.
-        os.system(f"snscrape --jsonl --max-results 100 twitter-search 'from:{username}'> aoc-tweets.json")
-        tweets_df = pd.read_json('aoc-tweets.json', lines=True)
-
-        # Access the tweet's written content.
-        tweets = list(tweets_df.content)
-        # Retain the words in the tweet. Remove unnecessary characters.
-        for i in range(len(tweets)):
-            tweets[i] = tweets[i].replace('\n', "")
+    total_tweets = {username: [] for username in usernames}
 
-        total_tweets[username] = tweets
+    # Retain the words in each tweet; ingest removes unnecessary characters.
+    for username, text in ingest.fetch_tweets(usernames, ingest.SnscrapeSource(max_results=100)):
+        total_tweets[username].append(text)
 
     return total_tweets
 
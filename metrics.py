@@ -0,0 +1,307 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the counters and histograms the scorer keeps about itself, and renders them in the Prometheus
+text format for app.py's /metrics page.
+
+The scoring code times its stages with
+
+    with metrics.stage('parse'):
+        ...
+
+which adds the time taken to the compel_stage_seconds histogram. Recording is off unless the METRICS environment
+variable is 1 (or enable() is called); while it is off, stage() returns a context manager that does nothing and the
+counters and histograms ignore what they are given, so the hooks cost next to nothing. Values that already exist
+elsewhere, such as the size of the AI lexicon or the result cache's hit count, are read when the page is rendered,
+through functions given to register_gauge.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Optional, Union
+
+# The upper bounds of the buckets of the stage timing histogram (in seconds) and of the sentences per text histogram.
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SENTENCE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+_enabled = os.environ.get('METRICS', '0') == '1'
+
+
+def enable() -> None:
+    """Start recording metrics."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording metrics. What has been recorded is kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether metrics are being recorded."""
+    return _enabled
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    """Return the Prometheus label set for the given label names and values, followed by the given extra label.
+
+    >>> _format_labels(('stage',), ('parse',), 'le="0.5"')
+    '{stage="parse",le="0.5"}'
+    >>> _format_labels((), ())
+    ''
+    """
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _escape(value: str) -> str:
+    """Escape the given label value as the Prometheus text format requires."""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    """Return the given sample value as the Prometheus text format writes it.
+
+    >>> _format_number(3), _format_number(0.25), _format_number(math.inf)
+    ('3', '0.25', '+Inf')
+    """
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """A count that only goes up, kept separately for each combination of label values.
+
+    Instance Attributes:
+        - name: The metric's name.
+        - help: What the metric counts.
+        - labels: The names of the metric's labels.
+
+    >>> requests = Counter('requests_total', 'Requests served.', ('endpoint',))
+    >>> enable(); requests.inc('submit'); requests.inc('submit')
+    >>> print(requests.render())
+    # HELP requests_total Requests served.
+    # TYPE requests_total counter
+    requests_total{endpoint="submit"} 2
+    """
+    # Private Instance Attributes:
+    # - _values: Maps each combination of label values to its count.
+    # - _lock: Guards _values.
+
+    name: str
+    help: str
+    labels: tuple[str, ...]
+    _values: dict[tuple[str, ...], float]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Add the given amount to the count with the given label values, if metrics are being recorded."""
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> str:
+        """Return the metric in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, count in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, values)} {_format_number(count)}')
+        return '\n'.join(lines)
+
+
+class Histogram:
+    """The distribution of a measured value, as counts of observations in cumulative buckets, kept separately for
+    each combination of label values.
+
+    Instance Attributes:
+        - name: The metric's name.
+        - help: What the metric measures.
+        - labels: The names of the metric's labels.
+        - buckets: The upper bounds of the buckets, in increasing order (a last +Inf bucket is implied).
+
+    >>> sizes = Histogram('sizes', 'Sizes seen.', buckets=(1, 10))
+    >>> enable(); sizes.observe(3); sizes.observe(30)
+    >>> print(sizes.render())
+    # HELP sizes Sizes seen.
+    # TYPE sizes histogram
+    sizes_bucket{le="1"} 0
+    sizes_bucket{le="10"} 1
+    sizes_bucket{le="+Inf"} 2
+    sizes_sum 33
+    sizes_count 2
+    """
+    # Private Instance Attributes:
+    # - _counts: Maps each combination of label values to the number of observations in each bucket (not
+    #            cumulative), the last being those greater than every bound.
+    # - _sums: Maps each combination of label values to the sum of its observations.
+    # - _lock: Guards _counts and _sums.
+
+    name: str
+    help: str
+    labels: tuple[str, ...]
+    buckets: tuple[float, ...]
+    _counts: dict[tuple[str, ...], list[int]]
+    _sums: dict[tuple[str, ...], float]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._counts = {}
+        self._sums = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record the given value under the given label values, if metrics are being recorded."""
+        if not _enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+                self._sums[label_values] = 0
+            counts[index] += 1
+            self._sums[label_values] += value
+
+    def render(self) -> str:
+        """Return the metric in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for values, counts in sorted(self._counts.items()):
+                total = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    total += count
+                    bucket_labels = _format_labels(self.labels, values, f'le="{_format_number(bound)}"')
+                    lines.append(f'{self.name}_bucket{bucket_labels} {total}')
+                labels = _format_labels(self.labels, values)
+                lines.append(f'{self.name}_sum{labels} {_format_number(self._sums[values])}')
+                lines.append(f'{self.name}_count{labels} {total}')
+        return '\n'.join(lines)
+
+
+class Gauge:
+    """A value read from a function whenever the metrics are rendered.
+
+    The function returns a number, or a dictionary mapping each value of the metric's one label to a number.
+
+    Instance Attributes:
+        - name: The metric's name.
+        - help: What the metric reports.
+        - label: The name of the metric's label, if the function returns a dictionary.
+        - kind: The Prometheus type of the metric: 'gauge', or 'counter' for a total kept elsewhere.
+        - function: Returns the current value.
+    """
+    name: str
+    help: str
+    label: Optional[str]
+    kind: str
+    function: Callable[[], Union[float, dict[str, float]]]
+
+    def __init__(self, name: str, help: str, function: Callable[[], Union[float, dict[str, float]]],
+                 label: Optional[str] = None, kind: str = 'gauge') -> None:
+        self.name = name
+        self.help = help
+        self.function = function
+        self.label = label
+        self.kind = kind
+
+    def render(self) -> str:
+        """Return the metric in the Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        value = self.function()
+        if isinstance(value, dict):
+            for label_value, number in sorted(value.items()):
+                lines.append(f'{self.name}{_format_labels((self.label,), (label_value,))} {_format_number(number)}')
+        else:
+            lines.append(f'{self.name} {_format_number(value)}')
+        return '\n'.join(lines)
+
+
+class _StageTimer:
+    """Adds the time spent in a with block to compel_stage_seconds under the given stage."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        STAGE_SECONDS.observe(time.perf_counter() - self._start, self._name)
+
+
+_NOT_TIMED = contextlib.nullcontext()
+
+
+def stage(name: str) -> Union[_StageTimer, contextlib.nullcontext]:
+    """Return a context manager that records how long its with block takes as the given stage of the scorer, or
+    does nothing if metrics are not being recorded."""
+    return _StageTimer(name) if _enabled else _NOT_TIMED
+
+
+STAGE_SECONDS = Histogram('compel_stage_seconds', 'Time spent in each stage of scoring a text.', ('stage',))
+TEXTS_SCORED = Counter('compel_texts_scored_total', 'Texts scored, by mode.', ('mode',))
+SENTENCES_PER_TEXT = Histogram('compel_sentences_per_text', 'Sentences in each scored text.',
+                               buckets=SENTENCE_BUCKETS)
+HTTP_REQUESTS = Counter('compel_http_requests_total', 'HTTP requests received, by endpoint.', ('endpoint',))
+
+_metrics: list[Union[Counter, Histogram, Gauge]] = [STAGE_SECONDS, TEXTS_SCORED, SENTENCES_PER_TEXT, HTTP_REQUESTS]
+_metrics_lock = threading.Lock()
+
+
+def register_gauge(name: str, help: str, function: Callable[[], Union[float, dict[str, float]]],
+                   label: Optional[str] = None, kind: str = 'gauge') -> Gauge:
+    """Add a metric read from the given function when the metrics are rendered (see Gauge), and return it.
+
+    A metric with the same name replaces the one registered before it.
+    """
+    gauge = Gauge(name, help, function, label, kind)
+    with _metrics_lock:
+        _metrics[:] = [metric for metric in _metrics if metric.name != name] + [gauge]
+    return gauge
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text format.
+
+    A gauge whose function raises is left out, so that one broken source does not hide the others.
+    """
+    with _metrics_lock:
+        metrics = list(_metrics)
+    parts = []
+    for metric in metrics:
+        try:
+            parts.append(metric.render())
+        except Exception:  # A gauge's source failed; report everything else.
+            continue
+    return '\n'.join(parts) + '\n'
+
@@ -0,0 +1,72 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the process-wide registry of spaCy pipelines. Every module that needs a parse asks this registry
+for its model instead of calling spacy.load itself, so the model is loaded once per process (the first time it is
+needed, or up front through preload) rather than once per sentence or word.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Any
+
+import bootstrap
+
+DEFAULT_MODEL = 'en_core_web_sm'
+
+# The number of sentences spaCy parses together when sentences are parsed in bulk.
+DEFAULT_BATCH_SIZE = 256
+
+# The scorer only reads token.pos_, token.tag_, token.dep_, token.head and token.lemma_, so the named entity
+# recogniser is never needed. Excluded components are not even deserialised, which also shortens the load.
+EXCLUDED_COMPONENTS = ('ner',)
+
+_models = {}
+_load_times = {}
+_lock = threading.Lock()
+
+
+def get_nlp(name: str = DEFAULT_MODEL) -> Any:
+    """Return the spaCy pipeline with the given name, loading it the first time it is asked for.
+
+    The pipeline is shared by every caller in the process. Loading is guarded by a lock so that concurrent
+    first requests (e.g. several Flask threads) still load the model only once.
+    """
+    nlp = _models.get(name)
+    if nlp is not None:
+        return nlp
+
+    with _lock:
+        # Another thread may have finished loading while this one was waiting for the lock.
+        if name not in _models:
+            # spaCy takes a while to import, so it is only imported once a pipeline is actually needed.
+            import spacy
+
+            start = time.perf_counter()
+            _models[name] = spacy.load(bootstrap.spacy_model_path(name), exclude=list(EXCLUDED_COMPONENTS))
+            _load_times[name] = time.perf_counter() - start
+        return _models[name]
+
+
+def preload(name: str = DEFAULT_MODEL) -> float:
+    """Load the given pipeline now and return how many seconds loading it took.
+
+    Call this at startup so the load is paid before the first request rather than during it.
+    """
+    get_nlp(name)
+    return _load_times[name]
+
+
+def load_time(name: str = DEFAULT_MODEL) -> float | None:
+    """Return how many seconds it took to load the given pipeline, or None if it has not been loaded."""
+    return _load_times.get(name)
+
+
+def is_loaded(name: str = DEFAULT_MODEL) -> bool:
+    """Return whether the given pipeline has already been loaded in this process."""
+    return name in _models
@@ -11,11 +11,13 @@ This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Mar
 """
 
 from __future__ import annotations
-from typing import Any, Optional
-import spacy
+from typing import Any, Iterable, Iterator, Mapping, Optional
 
 import analysis
+import document
+import nlp_models
 import process
+import sentiment_lexicon
 
 
 #######################################################################################
@@ -25,20 +27,41 @@ import process
 class ParseTree:
     """A recursive tree data structure.
 
+    Instance Attributes:
+        - sentiment: The sentiment (pathos) score of this tree's root.
+        - tag: The fine-grained (Penn Treebank) tag of this tree's root word, or None if it is not known.
+        - node_id: An id for this tree's root that is unique within the whole tree, or None if it has not been given
+          one. Trees built from a spaCy parse use the token's index; build_index numbers any others.
+
     Representation Invariants:
         - self._root is not None or self._subtrees == []
         - all(not subtree.is_empty() for subtree in self._subtrees)
+        - all(subtree._parent is self for subtree in self._subtrees)
+        - all(self._subtrees[i]._position == i for i in range(len(self._subtrees)))
 
     """
     # Private Instance Attributes:
     # - _root: The word and its corresponding descriptors stored at this tree's root, or None if the tree is empty.
     # - _subtrees: The list of subtrees of this tree, which is empty when self._root is None or has no subtrees.
+    # - _parent: The tree this tree is a subtree of, or None if it is not a subtree.
+    # - _position: The index of this tree in its parent's list of subtrees.
+    # - _index: Maps the node_id of every node of this tree to the subtree rooted at it, or None if build_index has
+    #   not been called (or the tree changed since).
+    # - _first_by_root: Maps every root tuple in this tree to the first subtree (in preorder) with that root, or
+    #   None if build_index has not been called.
 
     _root: tuple[str, str, str, str] | None
     _subtrees: list
     sentiment: int | float
-
-    def __init__(self, root: Optional[Any], subtrees: list, sentiment: int = 0) -> None:  # list[Tree]
+    tag: Optional[str]
+    node_id: Optional[int]
+    _parent: Optional[ParseTree]
+    _position: int
+    _index: Optional[dict[int, ParseTree]]
+    _first_by_root: Optional[dict[tuple, ParseTree]]
+
+    def __init__(self, root: Optional[Any], subtrees: list, sentiment: int = 0,
+                 node_id: Optional[int] = None, tag: Optional[str] = None) -> None:  # list[Tree]
         """Initialize a new Tree with the given root tuple and subtree list.
 
         If root is None, the tree is empty.
@@ -49,6 +72,75 @@ class ParseTree:
         self._root = root
         self._subtrees = subtrees
         self.sentiment = sentiment
+        self.tag = tag
+        self.node_id = node_id
+        self._parent = None
+        self._position = 0
+        self._index = None
+        self._first_by_root = None
+        for position, subtree in enumerate(subtrees):
+            if isinstance(subtree, ParseTree):
+                subtree._parent = self
+                subtree._position = position
+
+    def add_subtree(self, subtree: ParseTree) -> None:
+        """Add the given tree as the last subtree of this tree, linking it back to this tree.
+
+        Call build_index again afterwards if this tree's index has been built.
+        """
+        subtree._parent = self
+        subtree._position = len(self._subtrees)
+        self._subtrees.append(subtree)
+        self._index = None
+        self._first_by_root = None
+
+    def build_index(self) -> None:
+        """Index every node of this tree by its node_id and by its root tuple, so that node and
+        find_subtree_by_root take constant time.
+
+        Nodes without a node_id are given their position in a preorder traversal of this tree.
+
+        >>> tree = ParseTree(('good', 'ROOT', 'good', 'ADJ'), [ParseTree(('very', 'advmod', 'good', 'ADV'), [])])
+        >>> tree.build_index()
+        >>> tree.node(1).parent() is tree
+        True
+        """
+        self._index = {}
+        self._first_by_root = {}
+        position = 0
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            if tree.node_id is None:
+                tree.node_id = position
+            self._index[tree.node_id] = tree
+            self._first_by_root.setdefault(tree._root, tree)
+            position += 1
+            stack.extend(reversed(tree._subtrees))
+
+    def node(self, node_id: int) -> Optional[ParseTree]:
+        """Return the subtree of this tree whose root has the given node_id, or None if there is none."""
+        if self._index is None:
+            self.build_index()
+        return self._index.get(node_id)
+
+    def parent(self) -> Optional[ParseTree]:
+        """Return the tree this tree is a subtree of, or None if it is not a subtree."""
+        return self._parent
+
+    def right_sibling(self) -> Optional[ParseTree]:
+        """Return the subtree immediately to the right of this tree in its parent, or None if there is none.
+
+        >>> tree = ParseTree(('good', 'ROOT', 'good', 'ADJ'), [ParseTree(('not', 'neg', 'good', 'PART'), []),
+        ...                                                    ParseTree(('so', 'advmod', 'good', 'ADV'), [])])
+        >>> tree._subtrees[0].right_sibling()._root
+        ('so', 'advmod', 'good', 'ADV')
+        >>> tree._subtrees[1].right_sibling() is None
+        True
+        """
+        if self._parent is None or self._position + 1 >= len(self._parent._subtrees):
+            return None
+        return self._parent._subtrees[self._position + 1]
 
     def is_empty(self) -> bool:
         """
@@ -129,9 +221,13 @@ class ParseTree:
     def find_subtree_by_root(self, root: tuple) -> Any:
         """ Return the tree of a given node.
 
+        Uses the index from build_index when it has been built.
+
         Preconditions:
         - tree contains root
         """
+        if self._first_by_root is not None:
+            return self._first_by_root.get(root)
         if self._root == root:
             return self
         else:
@@ -184,9 +280,11 @@ class ParseTree:
                             siblings_so_far.extend(sibling)
             return siblings_so_far
 
-    def initial_pathos_of_tree(self) -> None:
+    def initial_pathos_of_tree(self, lexicon: Optional[sentiment_lexicon.LexiconSnapshot] = None) -> None:
         """Assign sentiment (pathos) scores to each tree in the ParseTree
 
+        The lexicon snapshot is looked up once for the whole tree and shared with every subtree.
+
         IMPLEMENTATION NOTES:
         - This function should be implemented similarly to the function assigning GreedyGameTree's probabilities.
         - STEP 2: Combine with propagate_negations
@@ -196,23 +294,30 @@ class ParseTree:
         >>> tree2[0].sentiment
         0
         """
-        if analysis.initial_pathos_to_tuple(self._root) != 0:
-            self.sentiment = analysis.initial_pathos_to_tuple(self._root)
+        if lexicon is None:
+            lexicon = sentiment_lexicon.get_lexicon()
+        score = analysis.initial_pathos_to_tuple(self._root, lexicon)
+        if score != 0:
+            self.sentiment = score
         for subtree in self._subtrees:
-            subtree.initial_pathos_of_tree()
+            subtree.initial_pathos_of_tree(lexicon)
 
-    def initial_pathos_of_tree_ai(self, text: str) -> None:
+    def initial_pathos_of_tree_ai(self, text: str | document.Document,
+                                  lexicon: Optional[Mapping[str, int | float]] = None) -> None:
         """Assign sentiment (pathos) scores to each tree in the ParseTree
 
-        Uses AI lexicon
+        Uses AI lexicon, which is created from the text once for the whole tree and shared with every subtree.
         >>> tree = trees_from_sentence("I am happy")[0]
         >>> tree.initial_pathos_of_tree_ai("I am happy")
         """
         if self._root is not None:
-            if analysis.initial_pathos_to_tuple_ai(self._root, text) != 0:
-                self.sentiment = analysis.initial_pathos_to_tuple_ai(self._root, text)
+            if lexicon is None:
+                lexicon = analysis.create_lexicon_ai(text, sentiment_lexicon.get_lexicon().words)
+            score = analysis.initial_pathos_to_tuple_ai(self._root, text, lexicon)
+            if score != 0:
+                self.sentiment = score
             for subtree in self._subtrees:
-                subtree.initial_pathos_of_tree_ai(text)
+                subtree.initial_pathos_of_tree_ai(text, lexicon)
 
     def propagate_negations(self) -> None:
         """Propagate negations throughout the ParseTree, changing sentiment scores by 1 accordingly
@@ -229,22 +334,39 @@ class ParseTree:
             parent node, otherwise it is negating the sibling nide that is immediately to the right of it.
         """
         if self.dep_instances('neg'):
+            if self._first_by_root is None:
+                self.build_index()
+            siblings = self.right('neg')
             for parent in self.upwards('neg'):
-                self.propogate_negation_helper(parent)
+                self.propogate_negation_helper(parent, siblings)
 
-    def propogate_negation_helper(self, node: tuple) -> None:
-        """Changes the sentiment of the appropriate sentiment bearing node for a negation"""
-        if self.find_subtree_by_root(node).sentiment != 0:
-            self.find_subtree_by_root(node).sentiment = - 1 * self.find_subtree_by_root(node).sentiment
+    def propogate_negation_helper(self, node: tuple, siblings: Optional[list[tuple]] = None) -> None:
+        """Changes the sentiment of the appropriate sentiment bearing node for a negation
+
+        siblings is self.right('neg'), which is computed here if it is not given.
+        """
+        subtree = self.find_subtree_by_root(node)
+        if subtree.sentiment != 0:
+            subtree.sentiment = - 1 * subtree.sentiment
         else:
-            for sibling in self.right('neg'):
-                if self.find_subtree_by_root(sibling).sentiment != 0:
-                    self.find_subtree_by_root(sibling).sentiment = - 1 * self.find_subtree_by_root(
-                        sibling).sentiment
+            if siblings is None:
+                siblings = self.right('neg')
+            for sibling in siblings:
+                sibling_tree = self.find_subtree_by_root(sibling)
+                if sibling_tree.sentiment != 0:
+                    sibling_tree.sentiment = - 1 * sibling_tree.sentiment
+
+    def is_intensifier(self) -> bool:
+        """Return whether this tree's root word is an intensifier, judged from the tags the parser gave it."""
+        return process.is_intensifier_token(self._root[0], self._root[3], self.tag)
+
+    def is_superlative(self) -> bool:
+        """Return whether this tree's root word is a superlative, judged from the tags the parser gave it."""
+        return process.is_superlative_token(self._root[0], self._root[3], self.tag)
 
     def has_intensifiers(self) -> bool:
         """Checks whether a sentence has an intensifier present"""
-        if process.is_intensifier(self._root[0]):
+        if self.is_intensifier():
             return True
         else:
             for subtree in self._subtrees:
@@ -266,12 +388,12 @@ class ParseTree:
         Implementation Notes:
         - First implement the is_intensifier function in process.py
         """
-        if self.has_intensifiers() is True and self.upwards('advmod') != []:
-            for parent in self.upwards('advmod'):
-                if self.find_subtree_by_root(parent).sentiment == 1:
-                    self.find_subtree_by_root(parent).sentiment = 2
-                elif self.find_subtree_by_root(parent).sentiment == -1:
-                    self.find_subtree_by_root(parent).sentiment = -2
+        parents = self.upwards('advmod')
+        if parents != [] and self.has_intensifiers() is True:
+            if self._first_by_root is None:
+                self.build_index()
+            for parent in parents:
+                self.find_subtree_by_root(parent)._boost_sentiment()
 
     def handle_superlatives(self) -> None:
         """ Improves the sentiment score of sentiment-bearing nodes that are superlatives
@@ -285,7 +407,7 @@ class ParseTree:
         Implementation Notes:
         - First implement the is_intensifier function in process.py
         """
-        if process.is_superlative(self._root[0]):
+        if self.is_superlative():
             if self.sentiment == 1:
                 self.sentiment += 1
             elif self.sentiment == -1:
@@ -295,19 +417,142 @@ class ParseTree:
 
     def final_pathos_of_tree(self) -> None:
         """Update all the sentiments of nodes based on negations, superlatives and intensifiers"""
-        self.initial_pathos_of_tree()
-        self.propagate_negations()
-        self.handle_superlatives()
-        self.handle_intensifiers()
+        self.fused_pathos_of_tree(sentiment_lexicon.get_lexicon().words)
 
-    def final_pathos_of_tree_ai(self, text: str) -> None:
+    def final_pathos_of_tree_ai(self, text: str | document.Document) -> None:
         """Update all the sentiments of nodes based on negations, superlatives and intensifiers using the ai version
         of the method initial_pathos_of_tree_ai
         """
-        self.initial_pathos_of_tree_ai(text)
-        self.propagate_negations()
-        self.handle_superlatives()
-        self.handle_intensifiers()
+        self.fused_pathos_of_tree(analysis.create_lexicon_ai(text, sentiment_lexicon.get_lexicon().words))
+
+    def fused_pathos_of_tree(self, lexicon: Mapping[str, int | float]) -> None:
+        """Assign every node its sentiment from the given lexicon and then adjust it for negations, superlatives
+        and intensifiers, in a single traversal of the tree.
+
+        This gives exactly the same sentiments as running initial_pathos_of_tree (with the same lexicon),
+        propagate_negations, handle_superlatives and handle_intensifiers one after the other, but visits each node
+        once instead of re-searching the tree for every negation and intensifier:
+        - Superlative and intensifier boosts only turn a sentiment of 1 or -1 into 2 or -2, and negations only flip
+          signs, so the three can be applied in any order.
+        - A node negated an even number of times ends up unchanged, so negations are counted and only the parity
+          of each node's count is applied.
+        - Like the separate passes, nodes are found by their root tuple, so a negation or intensifier whose target
+          shares its tuple with an earlier node affects the earlier node.
+
+        >>> tree = ParseTree(('good', 'ROOT', 'good', 'ADJ'), [ParseTree(("not", 'neg', 'good', 'PART'), [])])
+        >>> tree.fused_pathos_of_tree({'good': 1})
+        >>> tree.get_pathos_sum()
+        (1, True)
+        """
+        first_node = {}
+        negation_parents = []
+        intensifier_parents = []
+        has_intensifiers = False
+
+        # Each stack entry holds a node and whether a 'neg' or an 'advmod' node lies on the path above it;
+        # upwards does not look below such nodes.
+        stack = [(self, False, False)]
+        while stack:
+            tree, below_negation, below_intensifier = stack.pop()
+            word = tree._root[0]
+            first_node.setdefault(tree._root, tree)
+
+            score = lexicon.get(word, 0)
+            if score != 0:
+                tree.sentiment = score
+            if tree.is_superlative():
+                tree._boost_sentiment()
+            if not has_intensifiers and tree.is_intensifier():
+                has_intensifiers = True
+
+            for subtree in reversed(tree._subtrees):
+                is_negation = subtree._root[1] == 'neg'
+                is_intensifier = subtree._root[1] == 'advmod'
+                if is_negation and not below_negation:
+                    negation_parents.append(tree._root)
+                if is_intensifier and not below_intensifier:
+                    intensifier_parents.append(tree._root)
+                stack.append((subtree, below_negation or is_negation, below_intensifier or is_intensifier))
+
+        if negation_parents:
+            # The order in which the stack visited the parents does not matter; only how often each is negated.
+            flips = {}
+            parents_without_sentiment = 0
+            for parent in negation_parents:
+                if first_node[parent].sentiment != 0:
+                    flips[parent] = flips.get(parent, 0) ^ 1
+                else:
+                    parents_without_sentiment += 1
+            if parents_without_sentiment % 2 == 1:
+                for sibling, count in self._negated_sibling_parities().items():
+                    if count == 1 and first_node[sibling].sentiment != 0:
+                        flips[sibling] = flips.get(sibling, 0) ^ 1
+            for node, flip in flips.items():
+                if flip == 1:
+                    first_node[node].sentiment = - 1 * first_node[node].sentiment
+
+        if has_intensifiers:
+            for parent in intensifier_parents:
+                first_node[parent]._boost_sentiment()
+
+    def _boost_sentiment(self) -> None:
+        """Turn a sentiment of 1 or -1 into 2 or -2, as superlatives and intensifiers do."""
+        if self.sentiment == 1:
+            self.sentiment = 2
+        elif self.sentiment == -1:
+            self.sentiment = -2
+
+    def _negated_sibling_parities(self) -> dict[tuple, int]:
+        """Return, for every root tuple in self.right('neg'), whether it appears an odd (1) or even (0) number of
+        times, computed bottom-up in one pass instead of by recursive searches.
+
+        self.right(tag) repeats the search below a node once for every parent found by self.upwards(tag) that is
+        not the node itself, so a node's result is (the number of those parents equal to its root) copies of its own
+        negated siblings plus (the number of the other parents) copies of its subtrees' results. Only parities are
+        kept, since negating a node twice leaves it unchanged.
+        """
+        # Visit the subtrees of every node before the node itself.
+        order = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            order.append(tree)
+            stack.extend(tree._subtrees)
+
+        parents = {}
+        siblings = {}
+        for tree in reversed(order):
+            tree_parents = {}
+            subtree_siblings = {}
+            for subtree in tree._subtrees:
+                if subtree._root[1] == 'neg':
+                    tree_parents[tree._root] = tree_parents.get(tree._root, 0) + 1
+                else:
+                    for parent, count in parents[id(subtree)].items():
+                        tree_parents[parent] = tree_parents.get(parent, 0) + count
+                for sibling, count in siblings[id(subtree)].items():
+                    subtree_siblings[sibling] = subtree_siblings.get(sibling, 0) ^ count
+
+            if tree._root[1] == 'neg':
+                # upwards on a 'neg' node returns [None], so right repeats the search below it exactly once.
+                tree_siblings = subtree_siblings
+            else:
+                equal = tree_parents.get(tree._root, 0)
+                other = sum(tree_parents.values()) - equal
+                tree_siblings = {}
+                if equal % 2 == 1:
+                    for i in range(len(tree._subtrees) - 1):
+                        if tree._subtrees[i]._root[1] == 'neg':
+                            sibling = tree._subtrees[i + 1]._root
+                            tree_siblings[sibling] = tree_siblings.get(sibling, 0) ^ 1
+                if other % 2 == 1:
+                    for sibling, count in subtree_siblings.items():
+                        tree_siblings[sibling] = tree_siblings.get(sibling, 0) ^ count
+
+            parents[id(tree)] = tree_parents
+            siblings[id(tree)] = tree_siblings
+
+        return siblings[id(self)]
 
     def get_pathos_sum(self) -> tuple[int | float, bool]:
         """Returns the pathos (sentiment) score of the tree represented by the sentence as well as whether a negative
@@ -382,10 +627,14 @@ def tree_list_from_sentence(sentence: str) -> list[list[tuple[str, Any, Any, Any
     >>> my_tree_list[4]
     [('piano', 'dobj', 'drove', 'NOUN'), ['the', 'Greek']]
     """
-    nlp = spacy.load('en_core_web_sm')
+    nlp = nlp_models.get_nlp()
 
-    doc = nlp(sentence)
+    return tree_list_from_doc(nlp(sentence))
 
+
+def tree_list_from_doc(doc: Any) -> list[list[tuple[str, Any, Any, Any] | list[str]]]:
+    """Create a tree list for a sentence that has already been parsed by spaCy into the given Doc.
+    """
     tree_list = []
 
     for token in doc:
@@ -445,6 +694,8 @@ def tree_struct_from_word(word: str, tree_list: list, parent: str) -> list:
 def impose_tree_struct_on_list(tree_list: list) -> list:
     """ Imposes the tree structure on a given nested list.
 
+    Note that trees_from_doc no longer goes through tree lists; it builds trees straight from token indices.
+
     Implementation notes:
         - This method is *not* mutating. It simply returns a new, structured tree list.
 
@@ -492,21 +743,46 @@ def trees_from_sentence(sentence: str) -> Optional[list[ParseTree]]:
     It returns a list because a sentence can contain multiple roots and in this case multiple trees would for rather
     than just one.
     """
-    # Create a tree list from the sentence
-    tree_list = tree_list_from_sentence(sentence)
-    # Impose the tree structure onto the created tree list
-    tree_structs = impose_tree_struct_on_list(tree_list)
-    # Convert the tree list into a Parse Tree and return
-    trees = [tree_struct_to_tree(tree_struct) for tree_struct in tree_structs]
+    return trees_from_doc(nlp_models.get_nlp()(sentence))
+
+
+def trees_from_doc(doc: Any) -> list[ParseTree]:
+    """Return a list of parse trees for a sentence that has already been parsed by spaCy into the given Doc.
+
+    The trees are built in a single pass over the tokens, attaching every token to its head by the head's index
+    (token.head.i) rather than by searching for words, so building them takes linear time and repeated words are
+    attached to the right heads. There is one tree for each token that is its own head (a ROOT).
+    """
+    nodes = [ParseTree((token.text, token.dep_, token.head.text, token.pos_), [], node_id=token.i, tag=token.tag_)
+             for token in doc]
+    trees = []
+    for token in doc:
+        if token.head.i == token.i:
+            trees.append(nodes[token.i])
+        else:
+            # Tokens are visited from left to right, so each node's subtrees end up in the order of token.children.
+            nodes[token.head.i].add_subtree(nodes[token.i])
+    for tree in trees:
+        tree.build_index()
     return trees
 
 
+def parse_sentences(sentences: Iterable[str], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE,
+                    n_process: int = 1) -> Iterator[Any]:
+    """Parse the given sentences with spaCy in batches and yield their Docs, in the same order as the sentences.
+
+    Batching lets spaCy run its models over many sentences at once, which is much faster than parsing them one at a
+    time. If n_process is more than 1, the batches are spread over that many worker processes.
+    """
+    return nlp_models.get_nlp().pipe(sentences, batch_size=batch_size, n_process=n_process)
+
+
 def trees_from_sentences(sentences: list[str]) -> list[ParseTree]:
     """Returns a list of parse trees from a list of sentences
     """
     trees = []
-    for sentence in sentences:
-        trees.extend(trees_from_sentence(sentence))
+    for doc in parse_sentences(sentences):
+        trees.extend(trees_from_doc(doc))
     return trees
 
 
@@ -0,0 +1,129 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains PhraseMatcher, which finds every occurrence of a fixed list of phrases (such as the reasoning
+words or the problematic buzzwords) in one scan of a text, however many phrases there are.
+
+The phrases are compiled once into an Aho-Corasick automaton: a trie of the phrases in which every state also knows
+the longest proper suffix of its string that is a prefix of some phrase. Reading the text one character at a time and
+following these links reports each occurrence of each phrase as the scan reaches the occurrence's last character.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+from collections import deque
+from typing import Iterable
+
+
+class PhraseMatcher:
+    """A compiled set of phrases that can be counted in a text in a single scan.
+
+    Each phrase is counted the way str.count counts it: occurrences of the same phrase do not overlap, while
+    occurrences of different phrases may. Repeated phrases are only counted once.
+
+    Instance Attributes:
+        - phrases: The distinct phrases, in the order they were given.
+        - case_sensitive: Whether a phrase only matches text with the same case. If False, phrases and texts are
+          compared in lower case.
+
+    >>> matcher = PhraseMatcher(['he', 'she', 'hers', 'he'])
+    >>> matcher.counts('ushers and sheep, hehe')
+    {'he': 4, 'she': 2, 'hers': 1}
+    >>> matcher.total('ushers'), matcher.contains_any('ushers'), matcher.contains_any('HE')
+    (3, True, False)
+    >>> PhraseMatcher(['because'], case_sensitive=False).contains_any('Because I said so')
+    True
+    """
+    # Private Instance Attributes:
+    # - _goto: The transitions of the automaton: _goto[state] maps a character to the next state.
+    # - _fail: The state for the longest proper suffix of each state's string that is a state itself.
+    # - _outputs: The indices (in self.phrases) of the phrases that end at each state, including those ending at
+    #   the states its failure links lead to.
+    # - _lengths: The length of each phrase, once normalized.
+
+    phrases: tuple[str, ...]
+    case_sensitive: bool
+    _goto: list[dict[str, int]]
+    _fail: list[int]
+    _outputs: list[tuple[int, ...]]
+    _lengths: list[int]
+
+    def __init__(self, phrases: Iterable[str], case_sensitive: bool = True) -> None:
+        """Compile the given phrases.
+
+        Preconditions:
+            - all(phrase != '' for phrase in phrases)
+        """
+        self.case_sensitive = case_sensitive
+        self.phrases = tuple(dict.fromkeys(phrases))
+        if '' in self.phrases:
+            raise ValueError('PhraseMatcher cannot match an empty phrase')
+
+        self._goto = [{}]
+        outputs = [[]]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in self._normalize(phrase):
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(index)
+
+        # Fill in the failure links breadth first, so that a state's link is known before its children need it.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback != 0 and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                outputs[child].extend(outputs[self._fail[child]])
+                queue.append(child)
+        self._outputs = [tuple(output) for output in outputs]
+        self._lengths = [len(self._normalize(phrase)) for phrase in self.phrases]
+
+    def _normalize(self, text: str) -> str:
+        """Return the given text in the case phrases are compared in."""
+        return text if self.case_sensitive else text.lower()
+
+    def _matches(self, text: str) -> Iterable[tuple[int, int]]:
+        """Yield (phrase index, end position) for every occurrence of every phrase in the given text, in order of
+        their end positions. The end position is one past the occurrence's last character."""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        state = 0
+        for position, char in enumerate(self._normalize(text)):
+            while state != 0 and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in outputs[state]:
+                yield index, position + 1
+
+    def counts(self, text: str) -> dict[str, int]:
+        """Return how many times each phrase occurs in the given text, as str.count would count it."""
+        counts = [0] * len(self.phrases)
+        # The end of the last counted occurrence of each phrase; an occurrence overlapping it is not counted.
+        last_end = [0] * len(self.phrases)
+        for index, end in self._matches(text):
+            if end - self._lengths[index] >= last_end[index]:
+                counts[index] += 1
+                last_end[index] = end
+        return dict(zip(self.phrases, counts))
+
+    def total(self, text: str) -> int:
+        """Return the total number of occurrences of all the phrases in the given text."""
+        return sum(self.counts(text).values())
+
+    def contains_any(self, text: str) -> bool:
+        """Return whether any of the phrases occurs in the given text, stopping at the first occurrence."""
+        return any(True for _ in self._matches(text))
@@ -11,24 +11,76 @@ This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Mar
 """
 
 from __future__ import annotations
+import functools
 import re
-from python_ta.contracts import check_contracts
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import wordnet
-import nltk
-import spacy
+from typing import Any, Iterable, Iterator, Optional, TextIO, Union
+import bootstrap
+import nlp_models
+import phrase_matcher
 import read_csv
 
+REASONING_WORDS_FILE = 'data/reasoning_words.csv'
+
+# The number of (word, POS) pairs whose lemmas are remembered.
+LEMMA_CACHE_SIZE = 65536
+
+# The adverbs that intensify the sentiment of the word they modify.
+INTENSIFIERS = ('very', 'really', 'extremely', 'quite')
+
+# Superlatives that are not tagged as adjectives on their own.
+SUPERLATIVE_EXCEPTIONS = ('happiest', 'saddest')
+
+# One or more exclamation marks, question marks, or periods: what ends a sentence.
+SEPARATORS = re.compile('[!?.]+')
+
+# The number of characters read from a file at a time by iter_sentences.
+CHUNK_SIZE = 1 << 16
+
 
 def text_to_sentences(text: str) -> list[str]:
     """ Breaks a text up into a list of the sentences it's composed of.
     >>> text_to_sentences("We should not buy more? We have 13, 14, and 15 cars, trucks, and tractors, respectively.")
     ['We should not buy more', ' We have 13, 14, and 15 cars, trucks, and tractors, respectively']
     """
-    separators = "[!?.]+"  # This regular expression matches one or more exclamation marks, question marks, or periods.
+    return list(iter_sentences(text))
+
 
-    sentences = re.split(separators, text)
-    return [sentence for sentence in sentences if sentence != '']
+def iter_sentences(source: Union[str, TextIO, Iterable[str]], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the sentences of a text one at a time, as text_to_sentences would return them.
+
+    The text may be a string, a file opened for reading text (read chunk_size characters at a time), or any
+    iterable of consecutive pieces of text, such as the lines of a file. Only the sentence being read is held in
+    memory, and separators cut in two by the end of a piece are handled.
+
+    >>> list(iter_sentences(['Hi! How', ' are you?', '?! Fine']))
+    ['Hi', ' How are you', ' Fine']
+    """
+    if isinstance(source, str):
+        start = 0
+        for match in SEPARATORS.finditer(source):
+            if match.start() > start:
+                yield source[start:match.start()]
+            start = match.end()
+        if start < len(source):
+            yield source[start:]
+        return
+
+    if hasattr(source, 'read'):
+        source = iter(functools.partial(source.read, chunk_size), '')
+    # The pieces of the sentence that is still being read. None of them contains a separator.
+    unfinished = []
+    for chunk in source:
+        pieces = SEPARATORS.split(chunk)
+        if len(pieces) == 1:
+            unfinished.append(chunk)
+            continue
+        pieces[0] = ''.join(unfinished) + pieces[0]
+        unfinished = [pieces.pop()]
+        # Empty pieces come from separators at either end of the chunk, or from one that was cut in two.
+        yield from (sentence for sentence in pieces if sentence != '')
+    last = ''.join(unfinished)
+    if last != '':
+        yield last
 
 
 def upper_to_lower(sentences: list[str]) -> list[str]:
@@ -49,43 +101,74 @@ def lemmatize(word: str) -> str:
     >>> lemmatize('was')
     'be'
     """
-    # download 'averaged_perceptron_tagger' if not already present in system.
-    nltk.download('averaged_perceptron_tagger')
-    # Initialize the WordNetLemmatizer function.
-    lemmatizer = WordNetLemmatizer()
+    return lemmatize_many([word])[0]
+
+
+def lemmatize_many(words: Iterable[Any], batch_size: int = nlp_models.DEFAULT_BATCH_SIZE) -> list[str]:
+    """Return the lemma of each of the given words, which may be strings or spaCy tokens.
+
+    A token is lemmatized by lemmatize_token, using its existing parse. All the strings are tagged together in
+    one pass of spaCy's pipeline (each on its own, as lemmatize does), and then lemmatized by lemmatize_with_pos.
+    """
+    words = list(words)
+    strings = list(dict.fromkeys(word for word in words if isinstance(word, str)))
+    pos_tags = {}
+    if strings:
+        nlp = nlp_models.get_nlp()
+        for string, doc in zip(strings, nlp.pipe(strings, batch_size=batch_size)):
+            # Like the tag of a single word, use the tag of the last token if spaCy splits the string.
+            pos_tags[string] = doc[-1].pos_ if len(doc) > 0 else ''
+    return [lemmatize_with_pos(word, pos_tags[word]) if isinstance(word, str) else lemmatize_token(word)
+            for word in words]
+
+
+def lemmatize_token(token: Any) -> str:
+    """Return the lemma of a token of a sentence parsed by spaCy.
+
+    The lemma spaCy assigned while parsing is used when the pipeline has a lemmatizer; otherwise the token's text
+    is lemmatized with its POS tag by lemmatize_with_pos.
+    """
+    if token.lemma_:
+        return token.lemma_
+    return lemmatize_with_pos(token.text, token.pos_)
 
-    # Find the parts of speech tag for the word.
-    spacy.load('en_core_web_sm')
-    nlp = spacy.load('en_core_web_sm')
 
-    doc = nlp(word)
-    pos_tag = ''
-    for token in doc:
-        pos_tag = token.pos_
+@functools.lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize_with_pos(word: str, pos: str) -> str:
+    """Return the lemma of a word with the given (universal) POS tag, as found by WordNet.
+
+    Results are kept in a bounded least-recently-used cache keyed by (word, pos), so each distinct pair is only
+    looked up in WordNet once.
+    """
+    from nltk.corpus import wordnet
 
     # Since the lemmatizer takes in a word and the first letter of the part of speech (POS) tag as input, find the
     # first letter of the pos tag. Then, call the lemmatizer.
-    if pos_tag.startswith('J'):
-        pos_tag = wordnet.ADJ
-        return lemmatizer.lemmatize(word, pos_tag)
+    if pos.startswith('J'):
+        return _wordnet_lemmatizer().lemmatize(word, wordnet.ADJ)
 
-    elif pos_tag.startswith('V') or pos_tag == 'AUX':
-        pos_tag = wordnet.VERB
-        return lemmatizer.lemmatize(word, pos_tag)
+    elif pos.startswith('V') or pos == 'AUX':
+        return _wordnet_lemmatizer().lemmatize(word, wordnet.VERB)
 
-    elif pos_tag.startswith('N'):
-        pos_tag = wordnet.NOUN
-        return lemmatizer.lemmatize(word, pos_tag)
+    elif pos.startswith('N'):
+        return _wordnet_lemmatizer().lemmatize(word, wordnet.NOUN)
 
-    elif pos_tag.startswith('R'):
-        pos_tag = wordnet.ADV
-        return lemmatizer.lemmatize(word, pos_tag)
+    elif pos.startswith('R'):
+        return _wordnet_lemmatizer().lemmatize(word, wordnet.ADV)
 
     else:
-        pos_tag = None
         return word
 
 
+@functools.lru_cache(maxsize=None)
+def _wordnet_lemmatizer() -> Any:
+    """Return the WordNet lemmatizer shared by every lemmatization in this process."""
+    from nltk.stem import WordNetLemmatizer
+
+    bootstrap.require('wordnet')
+    return WordNetLemmatizer()
+
+
 def is_intensifier(word: str) -> bool:
     """Check whether a word is an intensifier
 
@@ -100,9 +183,12 @@ def is_intensifier(word: str) -> bool:
     >>> is_intensifier('nice')
     False
     """
+    import nltk
+
+    bootstrap.require('punkt', 'averaged_perceptron_tagger')
     tokens = nltk.word_tokenize(word)
     tagged = nltk.pos_tag(tokens)
-    intensifiers = [w for w, pos in tagged if pos == 'RB' and w in ['very', 'really', 'extremely', 'quite']]
+    intensifiers = [w for w, pos in tagged if pos == 'RB' and w in INTENSIFIERS]
     if not intensifiers:
         return False
     else:
@@ -118,15 +204,57 @@ def is_superlative(word: str) -> bool:
     True
     """
 
-    nltk.download('averaged_perceptron_tagger')
+    import nltk
+
+    bootstrap.require('averaged_perceptron_tagger')
     pos_tag = nltk.pos_tag([word])[0][1]
-    exceptions = ['happiest', 'saddest']
-    if ('JJ' in pos_tag and 'st' in word) or word in exceptions:
+    if ('JJ' in pos_tag and 'st' in word) or word in SUPERLATIVE_EXCEPTIONS:
         return True
     else:
         return False
 
 
+def is_intensifier_token(word: str, pos: str, tag: Optional[str] = None) -> bool:
+    """Check whether a word of a parsed sentence is an intensifier, using the tags the parser already gave it
+    instead of tagging the word again like is_intensifier does.
+
+    pos is the word's universal POS tag (spaCy's token.pos_) and tag its fine-grained Penn Treebank tag
+    (token.tag_), which is the tag is_intensifier checks. When the fine-grained tag is not known, pos is used.
+
+    >>> is_intensifier_token('really', 'ADV', 'RB')
+    True
+    >>> is_intensifier_token('very', 'ADV')
+    True
+    >>> is_intensifier_token('nice', 'ADJ', 'JJ')
+    False
+    """
+    if tag:
+        is_adverb = tag == 'RB'
+    else:
+        is_adverb = pos == 'ADV'
+    return is_adverb and word in INTENSIFIERS
+
+
+def is_superlative_token(word: str, pos: str, tag: Optional[str] = None) -> bool:
+    """Check whether a word of a parsed sentence is a superlative, using the tags the parser already gave it
+    instead of tagging the word again like is_superlative does.
+
+    pos and tag are as in is_intensifier_token.
+
+    >>> is_superlative_token('best', 'ADJ', 'JJS')
+    True
+    >>> is_superlative_token('happiest', 'NOUN')
+    True
+    >>> is_superlative_token('best', 'ADV', 'RBS')
+    False
+    """
+    if tag:
+        is_adjective = 'JJ' in tag
+    else:
+        is_adjective = pos == 'ADJ'
+    return (is_adjective and 'st' in word) or word in SUPERLATIVE_EXCEPTIONS
+
+
 def is_numeral(word: str) -> bool:
     """ Return True if the given word is a numeral and False otherwise.
 
@@ -183,12 +311,19 @@ def is_reasoning_text(text: str) -> bool:
     >>> is_reasoning_text("Inflation is at 16%, marking an all-time high.")
     False
     """
-    reasoning_words = read_csv.reasoning_words_list('data/reasoning_words.csv')
-    text = text.lower()
-    for word in reasoning_words:
-        if word in text:
-            return True
-    return False
+    return reasoning_matcher().contains_any(text)
+
+
+@functools.lru_cache(maxsize=None)
+def reasoning_matcher(csv_file: str = REASONING_WORDS_FILE) -> phrase_matcher.PhraseMatcher:
+    """Return a matcher for the reasoning words in the given csv file, ignoring case.
+
+    The file is read and the matcher compiled the first time each file is asked for.
+
+    >>> reasoning_matcher().counts('Because of this, and because of that')['because']
+    2
+    """
+    return phrase_matcher.PhraseMatcher(read_csv.reasoning_words_list(csv_file), case_sensitive=False)
 
 
 def count_logos_numerals(text: str) -> list[int]:
@@ -238,10 +373,17 @@ def process_text(text: str) -> list[str]:
     >>> process_text(text)
     ['the castle crumbled overnight because i brought a knife to a gunfight', ' they took the crown but it is ok']
     """
-    text = handle_multiline(text)
-    sentences = text_to_sentences(text)
-    sentences = upper_to_lower(sentences)
-    return sentences
+    return list(iter_processed(text))
+
+
+def iter_processed(source: Union[str, TextIO, Iterable[str]], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the lowercase single-line sentences of a text one at a time, as process_text would return them.
+
+    The text may be given in any of the ways iter_sentences accepts.
+    """
+    # Newlines do not end sentences, so they can be replaced one sentence at a time.
+    for sentence in iter_sentences(source, chunk_size):
+        yield handle_multiline(sentence).lower()
 
 
 if __name__ == '__main__':
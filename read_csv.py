@@ -9,7 +9,6 @@ Copyright
 This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
 """
 import csv
-from python_ta.contracts import check_contracts
 
 
 def read_csv_positive_file(csv_file1: str) -> dict[str, int]:
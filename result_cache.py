@@ -0,0 +1,168 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains ResultCache, an in-process cache of the results of scoring texts, so that a text submitted many
+times (e.g. a viral post) is only split, parsed and scored once for as long as the lexicon stays the same.
+
+Entries are keyed by a hash of the (normalised) text together with the version of the lexicon it was scored with,
+so once that lexicon changes, older results are no longer found and age out of the cache. The cache keeps at most
+a fixed number of entries, evicting the least recently used first, and drops entries older than its time to live. A
+shared backend (e.g. one wrapping a Redis client) can be plugged in so that several worker processes share their
+results.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# The default number of results kept, and the default number of seconds each is kept for.
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_TTL = 600.0
+
+
+class CacheBackend:
+    """A cache shared between processes, consulted when a result is not in a ResultCache's own memory.
+
+    This is an abstract class. Subclasses must store values so that any process can read them back, e.g. by
+    pickling them.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the value stored under the given key, or None if there is none (or it has expired)."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store the given value under the given key for ttl seconds."""
+        raise NotImplementedError
+
+
+class ResultCache:
+    """A thread-safe least-recently-used cache whose entries expire after a fixed time.
+
+    Instance Attributes:
+        - max_size: The greatest number of entries kept in memory.
+        - ttl: The number of seconds an entry is kept for.
+        - backend: The shared cache consulted on a miss and written to on every put, or None.
+        - hits: The number of lookups that found a result (in memory or in the backend).
+        - misses: The number of lookups that did not.
+        - evictions: The number of entries dropped to make room for newer ones.
+
+    Representation Invariants:
+        - self.max_size > 0
+        - len(self._entries) <= self.max_size
+
+    >>> now = [0.0]
+    >>> cache = ResultCache(max_size=2, ttl=10, clock=lambda: now[0])
+    >>> cache.put('a', 1); cache.put('b', 2); cache.get('a')
+    1
+    >>> cache.put('c', 3); cache.get('b') is None
+    True
+    >>> now[0] = 11
+    >>> cache.get('a') is None
+    True
+    >>> cache.stats()
+    {'hits': 1, 'misses': 2, 'evictions': 1, 'size': 1, 'max_size': 2}
+    """
+    # Private Instance Attributes:
+    # - _entries: Maps each key to the time its entry expires at and its value, from least to most recently used.
+    # - _clock: Returns the current time in seconds.
+    # - _lock: Guards _entries and the counters.
+
+    max_size: int
+    ttl: float
+    backend: Optional[CacheBackend]
+    hits: int
+    misses: int
+    evictions: int
+    _entries: OrderedDict[Hashable, tuple[float, Any]]
+    _clock: Callable[[], float]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL,
+                 backend: Optional[CacheBackend] = None, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value cached under the given key, or None if there is none or it has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        value = self.backend.get(str(key)) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache the given value under the given key, in memory and in the backend if there is one."""
+        with self._lock:
+            self._store(key, value)
+        if self.backend is not None:
+            self.backend.set(str(key), value, self.ttl)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Keep the given value in memory, evicting the least recently used entry if the cache is full.
+
+        Preconditions:
+            - self._lock is held
+        """
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry kept in memory. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss and eviction counts and the current and greatest number of entries."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'max_size': self.max_size}
+
+
+def normalize_text(text: str) -> str:
+    """Return the given text with its Unicode characters in composed (NFC) form and every line ending as '\\n', so
+    that the same text typed on different systems is scored, and cached, once.
+
+    >>> normalize_text('caf\\u0065\\u0301\\r\\nbar\\rbaz') == 'caf\\u00e9\\nbar\\nbaz'
+    True
+    """
+    return unicodedata.normalize('NFC', text).replace('\r\n', '\n').replace('\r', '\n')
+
+
+def cache_key(text: str, version: Hashable) -> str:
+    """Return the key of the result of scoring the given (normalised) text with the given version of the lexicons."""
+    digest = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    return digest + ':' + hashlib.sha256(repr(version).encode('utf-8')).hexdigest()[:16]
@@ -0,0 +1,124 @@
+""" CSC111 Winter 2023 Course Project : Compel-O-Meter
+
+Description
+===========
+This file contains the compiled sentiment lexicon. The NLTK opinion lexicon and our own positive and negative word
+files are merged into one immutable snapshot the first time it is needed, and that snapshot is shared by every
+parse tree afterwards. Scoring a word is then a single dictionary lookup.
+
+The snapshot remembers the modification times of the files it was compiled from and is recompiled automatically
+when one of them changes on disk.
+
+Copyright
+==========
+This file is Copyright (c) 2023 Akshaya Deepak Ramachandran, Kashish Mittal, Maryam Taj and Pratibha Thakur
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import bootstrap
+import read_csv
+
+POSITIVE_WORDS_FILE = 'data/positive_words.csv'
+NEGATIVE_WORDS_FILE = 'data/negative_words.csv'
+
+# How often (in seconds) get_lexicon looks at the source files' modification times.
+CHECK_INTERVAL = 1.0
+
+
+class LexiconSnapshot:
+    """An immutable sentiment lexicon mapping words to their sentiment score (1 or -1).
+
+    Representation Invariants:
+        - all(score in {1, -1} for score in self.words.values())
+    """
+    # Private Instance Attributes:
+    # - _mtimes: The (path, modification time) pairs of the source files this snapshot was compiled from.
+
+    words: Mapping[str, int]
+    _mtimes: tuple[tuple[str, int], ...]
+
+    def __init__(self, words: dict[str, int], mtimes: tuple[tuple[str, int], ...]) -> None:
+        """Initialize a snapshot of a copy of the given words."""
+        self.words = MappingProxyType(dict(words))
+        self._mtimes = mtimes
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.words
+
+    def __getitem__(self, word: str) -> int:
+        return self.words[word]
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def score(self, word: str) -> int:
+        """Return the sentiment score of the given word, or 0 if the word is not in the lexicon.
+
+        >>> LexiconSnapshot({'happy': 1, 'sad': -1}, ()).score('sad')
+        -1
+        >>> LexiconSnapshot({'happy': 1, 'sad': -1}, ()).score('table')
+        0
+        """
+        return self.words.get(word, 0)
+
+    def version(self) -> tuple[tuple[str, int], ...]:
+        """Return the (path, modification time) pairs of the files this snapshot was compiled from, which identify
+        the version of the lexicon it holds."""
+        return self._mtimes
+
+    def is_stale(self) -> bool:
+        """Return whether any of the files this snapshot was compiled from changed since it was compiled."""
+        return any(_mtime(path) != mtime for path, mtime in self._mtimes)
+
+
+def _mtime(path: str) -> int:
+    """Return the modification time of the given file in nanoseconds, or -1 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def compile_lexicon(positive_file: str = POSITIVE_WORDS_FILE,
+                    negative_file: str = NEGATIVE_WORDS_FILE) -> LexiconSnapshot:
+    """Build a new snapshot from the NLTK opinion lexicon and the given positive and negative word files.
+
+    Words from the files take precedence over the NLTK opinion lexicon.
+    """
+    import nltk
+
+    mtimes = ((positive_file, _mtime(positive_file)), (negative_file, _mtime(negative_file)))
+    lexicon = {}
+    bootstrap.require('opinion_lexicon')
+    for word in set(nltk.corpus.opinion_lexicon.positive()):
+        lexicon[word] = 1
+    for word in set(nltk.corpus.opinion_lexicon.negative()):
+        lexicon[word] = -1
+    lexicon.update(read_csv.return_dictionary(positive_file, negative_file))
+    return LexiconSnapshot(lexicon, mtimes)
+
+
+_snapshot: Optional[LexiconSnapshot] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_lexicon() -> LexiconSnapshot:
+    """Return the shared lexicon snapshot, compiling it on first use or when its source files have changed."""
+    global _snapshot, _last_check
+
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and now - _last_check < CHECK_INTERVAL:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.is_stale():
+            _snapshot = compile_lexicon()
+        _last_check = now
+        return _snapshot
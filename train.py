@@ -1,21 +1,294 @@
 """Contains the code that 'trains' the ai_lexicon by running the algorithm several times
 on open source files, thus adding new words and updating each word's sentiment score.
+
+Training can run on several cores at once: the sentences are split into shards of a fixed size, and each shard is
+scored by a worker process against its own in-memory copy of the lexicon as it was when training started. Each
+worker learns from its shard in order, just as serial training would, and returns what it learned as
+(word -> sentiment_sum, count) deltas. The deltas are added up in shard order and written to the lexicon in one
+update at the end, so the result depends only on the input and the shard size, not on the number of workers.
+
+Corpora are streamed, so files larger than memory (including gzip-compressed ones ending in .gz) can be used.
+With --checkpoint, the position reached in the corpus and the deltas learned so far are saved every
+--checkpoint-every sentences, and an interrupted run started again with the same arguments resumes from the last
+checkpoint. Progress (sentences per second) is reported at every checkpoint.
+
+    python train.py                          # train on texts.txt using every core
+    python train.py --workers 1 --shard-size 500 other_texts.txt
+    python train.py --checkpoint data/train.checkpoint corpus1.txt.gz corpus2.txt.gz
 """
-from analysis import get_compellingness_ai
-from process import text_to_sentences
+from __future__ import annotations
+import codecs
+import collections
+import gzip
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Mapping, NamedTuple, Optional
+
+import ai_lexicon
+from analysis import get_compellingness_ai, iter_parsed
+from process import SEPARATORS, iter_sentences
+
+TEXTS_FILE = 'texts.txt'
+
+# The number of sentences each worker learns from before its deltas are merged.
+DEFAULT_SHARD_SIZE = 200
+
+# The number of bytes read from a corpus at a time, and the default number of sentences between checkpoints.
+CHUNK_SIZE = 1 << 20
+DEFAULT_CHECKPOINT_EVERY = 10000
 
 
 def run_on_sentences(text: str) -> None:
     """ Runs get_compellingess_ai on each sentence in a text file. """
-    sentences = text_to_sentences(text)
-    for sentence in sentences:
+    for sentence in iter_sentences(text):
         get_compellingness_ai(sentence)
 
 
-# Read the text file
-file_path = "texts.txt"
-with open(file_path, "r", encoding="utf-8") as file:
-    file_content = file.read().lower()
+# The lexicon entries every shard starts from, set once in each worker process by _start_worker.
+_base_entries: Mapping[str, tuple[float, float]] = {}
+
+
+def _start_worker(entries: Mapping[str, tuple[float, float]]) -> None:
+    """Remember the lexicon entries the shards given to this worker process start from."""
+    global _base_entries
+    _base_entries = entries
+
+
+def train_shard(sentences: list[str]) -> dict[str, tuple[float, float]]:
+    """Learn from the given sentences in order, starting from the base lexicon entries, and return the
+    (sentiment_sum, word_count) deltas learned. The sentences are parsed in one batch."""
+    lexicon = ai_lexicon.MemoryAILexicon(_base_entries)
+    ai_lexicon.set_ai_lexicon(lexicon)
+    for parsed in iter_parsed(sentences):
+        get_compellingness_ai(parsed)
+    return lexicon.deltas()
+
+
+def shards(sentences: Iterable[str], shard_size: int) -> Iterator[list[str]]:
+    """Yield the given sentences in consecutive lists of shard_size sentences (the last may be shorter).
+
+    >>> list(shards(['a', 'b', 'c'], 2))
+    [['a', 'b'], ['c']]
+    """
+    sentences = iter(sentences)
+    shard = list(itertools.islice(sentences, shard_size))
+    while shard:
+        yield shard
+        shard = list(itertools.islice(sentences, shard_size))
+
+
+class CorpusPosition(NamedTuple):
+    """A point in a list of corpus files between two sentences, from which reading can be resumed.
+
+    Reading resumes by decoding the file with index file_index from byte offset onwards, putting carry (the lowercased
+    start of a sentence that began before offset) in front of it, and skipping the first skip sentences.
+    """
+    file_index: int
+    offset: int
+    carry: str
+    skip: int
+
+
+def open_corpus(path: str) -> BinaryIO:
+    """Open the given corpus file for reading bytes, decompressing it if its name ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def iter_corpus(files: list[str], start: CorpusPosition = CorpusPosition(0, 0, '', 0),
+                chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, CorpusPosition]]:
+    """Yield every sentence of the given UTF-8 corpus files from the given position on, lowercased and split as
+    text_to_sentences(file.read().lower()) would split each file, together with the position just after it.
+
+    Only chunk_size bytes (and the sentence being read) are held in memory at a time. Sentences never continue
+    from one file into the next. Resuming in a gzip file decompresses it again up to the position.
+    """
+    for file_index in range(start.file_index, len(files)):
+        if file_index == start.file_index:
+            offset, carry, skip = start.offset, start.carry, start.skip
+        else:
+            offset, carry, skip = 0, '', 0
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with open_corpus(files[file_index]) as file:
+            file.seek(offset)
+            # Where the sentences counted by emitted begin: the offset and the carry in front of it.
+            resume_offset, resume_carry, emitted = offset, carry, 0
+            while True:
+                chunk = file.read(chunk_size)
+                pieces = SEPARATORS.split(carry + decoder.decode(chunk, final=not chunk).lower())
+                # The last piece may go on in the next chunk, unless this was the end of the file. Splitting the
+                # text in pieces like this gives the same sentences wherever the chunks end, since empty ones
+                # (such as those between the two halves of a '...' that was cut in two) are dropped.
+                carry = pieces.pop() if chunk else ''
+                for sentence in pieces:
+                    if sentence == '':
+                        continue
+                    emitted += 1
+                    if skip > 0:
+                        skip -= 1
+                        continue
+                    yield sentence, CorpusPosition(file_index, resume_offset, resume_carry, emitted)
+                if not chunk:
+                    break
+                # Text read so far ends at the first byte the decoder is still holding on to.
+                offset += len(chunk)
+                if skip == 0:
+                    resume_offset, resume_carry, emitted = offset - len(decoder.getstate()[0]), carry, 0
+
+
+def load_checkpoint(path: str, files: list[str], shard_size: int) -> Optional[dict[str, Any]]:
+    """Return the training checkpoint saved in the given file, or None if there is none.
+
+    Raise ValueError if it was saved by a run over other files or with another shard size, since resuming it
+    would then not give the same result as training without interruption.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        state = json.load(file)
+    if state['files'] != files or state['shard_size'] != shard_size:
+        raise ValueError(f'{path} is a checkpoint of training on {state["files"]} with shard size '
+                         f'{state["shard_size"]}; delete it to start again.')
+    state['position'] = CorpusPosition(*state['position'])
+    state['deltas'] = {word: tuple(delta) for word, delta in state['deltas'].items()}
+    return state
+
+
+def save_checkpoint(path: str, state: Mapping[str, Any]) -> None:
+    """Save the given training state to the given file, replacing its previous contents all at once, so that an
+    interruption leaves either the old checkpoint or the new one."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def report_progress(sentences: int, seconds: float, position: CorpusPosition, files: list[str]) -> None:
+    """Print how many sentences have been learned from and how fast, and how far into which file training is."""
+    rate = sentences / seconds if seconds > 0 else 0.0
+    print(f'{sentences} sentences, {rate:.1f} sentences/s, {files[position.file_index]} '
+          f'byte {position.offset}', file=sys.stderr, flush=True)
+
+
+def learn_in_parallel(sentences: Iterable[str], workers: Optional[int] = None,
+                      shard_size: int = DEFAULT_SHARD_SIZE,
+                      entries: Optional[Mapping[str, tuple[float, float]]] = None) -> dict[str, tuple[float, float]]:
+    """Return the (sentiment_sum, word_count) deltas learned from the given sentences, starting from the given
+    lexicon entries (by default, those of the shared AI lexicon), using the given number of worker processes
+    (by default, one per core).
+
+    At most two shards per worker are in flight at a time, so the sentences are read as they are needed.
+    """
+    if entries is None:
+        entries = ai_lexicon.get_ai_lexicon().entries()
+    total = {}
+    for deltas in _learn_shards(shards(sentences, shard_size), workers, entries):
+        ai_lexicon.merge_deltas(total, deltas)
+    return total
+
+
+def _learn_shards(shard_lists: Iterable[list[str]], workers: Optional[int],
+                  entries: Mapping[str, tuple[float, float]]) -> Iterator[dict[str, tuple[float, float]]]:
+    """Yield the deltas learned from each of the given shards, in order, using the given number of worker
+    processes (by default, one per core). At most two shards per worker are in flight at a time."""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(entries,)) as executor:
+        in_flight: collections.deque[Future] = collections.deque()
+        for shard in shard_lists:
+            in_flight.append(executor.submit(train_shard, shard))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def train(text: str, workers: Optional[int] = None, shard_size: int = DEFAULT_SHARD_SIZE) -> int:
+    """Learn from every sentence of the given text in parallel, add what was learned to the AI lexicon in one
+    update, and return the number of words updated."""
+    deltas = learn_in_parallel(iter_sentences(text), workers, shard_size)
+    lexicon = ai_lexicon.get_ai_lexicon()
+    lexicon.record_many(deltas)
+    lexicon.compact()
+    return len(deltas)
+
+
+def train_corpus(files: list[str], checkpoint: Optional[str] = None,
+                 checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY, workers: Optional[int] = None,
+                 shard_size: int = DEFAULT_SHARD_SIZE,
+                 progress: Optional[Callable[[int, float, CorpusPosition, list[str]], None]] = report_progress,
+                 chunk_size: int = CHUNK_SIZE) -> int:
+    """Learn from every sentence of the given corpus files in parallel, streaming them, add what was learned to the
+    AI lexicon in one update, and return the number of words updated.
+
+    If a checkpoint file is given, the position reached and the deltas learned so far are saved in it about every
+    checkpoint_every sentences (at the end of a shard), and if it already exists training resumes from it. The
+    result is the same as if training had never been interrupted. The lexicon itself is only written once, at the
+    end, after which the checkpoint is deleted; the update carries an id kept in the checkpoint, so that a run
+    resumed after the update was written does not write it again. progress is called with the number of sentences learned from, the
+    seconds spent, the position reached and the files, as often as a checkpoint would be saved.
+    """
+    state = load_checkpoint(checkpoint, files, shard_size) if checkpoint is not None else None
+    if state is None:
+        state = {'files': files, 'shard_size': shard_size, 'position': CorpusPosition(0, 0, '', 0),
+                 'sentences': 0, 'deltas': {}, 'batch_id': uuid.uuid4().hex}
+
+    lexicon = ai_lexicon.get_ai_lexicon()
+    # The position after the last sentence of each shard handed to the workers, in order.
+    ends = collections.deque()
+
+    def shard_lists() -> Iterator[list[str]]:
+        for shard in shards(iter_corpus(files, state['position'], chunk_size), shard_size):
+            ends.append((len(shard), shard[-1][1]))
+            yield [sentence for sentence, _ in shard]
+
+    start_time, start_sentences = time.monotonic(), state['sentences']
+    since_checkpoint = 0
+    for deltas in _learn_shards(shard_lists(), workers, lexicon.entries()):
+        count, state['position'] = ends.popleft()
+        ai_lexicon.merge_deltas(state['deltas'], deltas)
+        state['sentences'] += count
+        since_checkpoint += count
+        if since_checkpoint >= checkpoint_every:
+            since_checkpoint = 0
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, state)
+            if progress is not None:
+                progress(state['sentences'], time.monotonic() - start_time, state['position'], files)
+
+    if checkpoint is not None:
+        # Save the end of the corpus as the position reached, so that a run resumed after the update below has
+        # nothing left to learn from; the update's batch id keeps it from being recorded twice.
+        save_checkpoint(checkpoint, state)
+    lexicon.record_many(state['deltas'], batch_id=state['batch_id'])
+    lexicon.compact()
+    if progress is not None and state['sentences'] > start_sentences:
+        progress(state['sentences'], time.monotonic() - start_time, state['position'], files)
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return len(state['deltas'])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Train the AI lexicon on text files (which may be gzipped).')
+    parser.add_argument('files', nargs='*', default=[TEXTS_FILE])
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument('--checkpoint', default=None, help='file to save progress in and resume from')
+    parser.add_argument('--checkpoint-every', type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                        help='sentences between checkpoints and progress reports')
+    args = parser.parse_args()
 
-# Process the text from the file
-run_on_sentences(file_content)
+    # Process the text from the files
+    updated = train_corpus(args.files, args.checkpoint, args.checkpoint_every, args.workers, args.shard_size)
+    print(f'Updated {updated} words.')